@@ -0,0 +1,363 @@
+import os
+import sys
+import json
+import hashlib
+import argparse
+import collections
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from generate_file import PDFDownloader, delete_all_files_in_folder
+from model import PDF_TABLE
+
+
+# PDF_TABLE arguments a job may set besides url and page_pdf_list, with their type
+JOB_OPTIONS = {"in_memory": bool, "dpi": int, "adaptive_dpi": bool, "mode": str, "track_memory": bool}
+JOB_MODES = ("image", "vector")
+
+
+def validate_job(job, extra_fields = ()):
+    """
+    TODO: Check that a job has the shape of the PDF_TABLE arguments
+    ? param job: Dict with "url", "page_pdf_list" and optionally JOB_OPTIONS
+    ? param extra_fields: Other fields the caller allows, e.g. the "id" of a job line
+    Raises ValueError on the first problem, so a bad job is rejected
+    before it reaches a worker process.
+    """
+    if not isinstance(job, dict):
+        raise ValueError("A job must be a JSON object")
+    unknown = set(job) - {"url", "page_pdf_list"} - set(JOB_OPTIONS) - set(extra_fields)
+    if unknown:
+        raise ValueError(f"Unknown job fields: {', '.join(sorted(unknown))}")
+    if not isinstance(job.get("url"), str) or not job["url"]:
+        raise ValueError("url must be a non-empty string")
+    pages = job.get("page_pdf_list")
+    if not isinstance(pages, list) or not pages or \
+            not all(isinstance(p, int) and not isinstance(p, bool) and p > 0 for p in pages):
+        raise ValueError("page_pdf_list must be a non-empty list of page numbers")
+    for key, expected in JOB_OPTIONS.items():
+        # bool is a subclass of int, so true/false is not a dpi and 1/0 is not a flag
+        if key in job and (not isinstance(job[key], expected) or isinstance(job[key], bool) != (expected is bool)):
+            raise ValueError(f"{key} must be of type {expected.__name__}")
+    if job.get("mode", "image") not in JOB_MODES:
+        raise ValueError(f"mode must be one of {', '.join(JOB_MODES)}")
+    if job.get("dpi", 1) <= 0:
+        raise ValueError("dpi must be positive")
+    return job
+
+
+def _run_pipeline(keys, download, tasks, on_result, download_workers = 4, workers = None):
+    """
+    TODO: Download PDFs in a thread pool and extract them in a process pool
+    Downloads share one PDFDownloader and the tasks of a PDF are handed to
+    the process pool as soon as it is on disk, so extraction overlaps with
+    the downloads that are still running and a slow server only holds up
+    its own job. Downloads and extractions are waited on together, so
+    on_result sees every task as soon as it completes, not once the last
+    download is over.
+    ? param keys: One key per PDF, e.g. the index or id of a job
+    ? param download: Function (pdf_downloader, key) -> path of the PDF, run in a thread
+    ? param tasks: Function (key, file_name) -> list of (tag, function, *args),
+        each function is called with args in a worker process
+    ? param on_result: Called in this process as on_result(key, tag, result, error)
+        for every task, and with tag None for a failed download. error is
+        "<type>: <message>" and result None when the step raised.
+    """
+    with PDFDownloader() as pdf_downloader, \
+            ThreadPoolExecutor(max_workers = download_workers) as downloader, \
+            ProcessPoolExecutor(max_workers = workers) as extractor:
+        downloads = {downloader.submit(download, pdf_downloader, key): key for key in keys}
+        extractions = {}
+        while downloads or extractions:
+            done, _ = wait(list(downloads) + list(extractions), return_when = FIRST_COMPLETED)
+            for future in done:
+                if future in downloads:
+                    key = downloads.pop(future)
+                    try:
+                        file_name = future.result()
+                    except Exception as e:
+                        on_result(key, None, None, f"{type(e).__name__}: {e}")
+                        continue
+                    for tag, function, *args in tasks(key, file_name):
+                        extractions[extractor.submit(function, *args)] = (key, tag)
+                else:
+                    key, tag = extractions.pop(future)
+                    try:
+                        result, error = future.result(), None
+                    except Exception as e:
+                        result, error = None, f"{type(e).__name__}: {e}"
+                    on_result(key, tag, result, error)
+
+
+class PDF_BATCH:
+    def __init__(self, jobs, folder, download_workers = 4, workers = None, in_memory = False,
+                 pdf_cache = None):
+        self.jobs = jobs # list of (url, page_pdf_list)
+        self.folder = folder
+        self.download_workers = download_workers # number of threads downloading PDFs
+        self.workers = workers # number of processes extracting tables, one per CPU when None
+        self.in_memory = in_memory
+        self.pdf_cache = pdf_cache # cache.PDFCache reusing PDFs downloaded by earlier runs
+        self.results = []
+    
+    def _job_folder(self, index):
+        # one folder per job so reports with the same file name do not overwrite each other
+        return os.path.join(self.folder, f"job_{index}")
+    
+    def _download(self, pdf_downloader, index):
+        url = self.jobs[index][0]
+        if self.pdf_cache is not None:
+            return self.pdf_cache.download(url = url, folder = self._job_folder(index))
+        return pdf_downloader.download(url = url, folder = self._job_folder(index))
+    
+    def _tasks(self, index, file_name):
+        url, pages = self.jobs[index]
+        pdf_table = PDF_TABLE(
+            url = url,
+            folder = self._job_folder(index),
+            page_pdf_list = pages,
+            in_memory = self.in_memory
+        )
+        return [("extract", pdf_table.extract_pages, file_name, pages)]
+    
+    def _on_result(self, index, tag, table_dict, error):
+        if error is not None:
+            self.results[index]["error"] = error
+        else:
+            self.results[index]["table_pdf_dict"] = {
+                f"page_{page_pdf}": table_dict[f"page_{page_pdf}"] for page_pdf in self.jobs[index][1]
+            }
+        if tag is not None:
+            delete_all_files_in_folder(folder_path = self._job_folder(index))
+    
+    def run(self):
+        """
+        TODO: Download and extract every job, see `_run_pipeline`
+        !Returns: One dict per job, in job order, with the extracted
+            `table_pdf_dict` or the `error` that stopped the job
+        """
+        self.results = [
+            {"url": url, "page_pdf_list": pages, "table_pdf_dict": None, "error": None}
+            for url, pages in self.jobs
+        ]
+        _run_pipeline(
+            range(len(self.jobs)), self._download, self._tasks, self._on_result,
+            download_workers = self.download_workers, workers = self.workers
+        )
+        print("Batch extraction completed successfully.")
+        return self.results
+
+
+def _extract_task(job, file_name, pages, folder):
+    # runs in a worker process
+    options = {key: job[key] for key in JOB_OPTIONS if key in job}
+    pdf_table = PDF_TABLE(url = job["url"], folder = folder, page_pdf_list = pages, **options)
+    return dict(pdf_table.iter_pages(file_name, pages))
+
+
+def read_jobs(jobs_file):
+    """
+    TODO: Read the jobs of a JSONL file, one JSON object per line
+    ? param jobs_file: Path to the file, each line has "url", "page_pdf_list",
+        optionally an "id" (the url by default) and JOB_OPTIONS, see `validate_job`
+    !Returns: List of (job id, job)
+    Lines with the same id are one job and their pages are merged, so
+    they must agree on the url and on every option.
+    """
+    jobs = []
+    settings = {}
+    with open(jobs_file, "r", encoding = "utf-8") as file:
+        for line_number, line in enumerate(file, start = 1):
+            if not line.strip():
+                continue
+            try:
+                job = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{jobs_file}:{line_number}: invalid JSON ({e})")
+            try:
+                validate_job(job, extra_fields = ("id",))
+            except ValueError as e:
+                raise ValueError(f"{jobs_file}:{line_number}: {e}")
+            job_id = str(job.get("id") or job["url"])
+            job_settings = {key: job.get(key) for key in ("url",) + tuple(JOB_OPTIONS)}
+            if settings.setdefault(job_id, (line_number, job_settings))[1] != job_settings:
+                raise ValueError(
+                    f"{jobs_file}:{line_number}: job {job_id} is also on line {settings[job_id][0]} "
+                    f"with a different url or options, give one of them another id"
+                )
+            jobs.append((job_id, job))
+    return jobs
+
+
+def read_journal(journal):
+    """
+    TODO: Read a checkpoint journal written by RESUMABLE_BATCH
+    ? param journal: Path to the journal
+    !Returns: Dict of job id -> {page: tables} of the finished pages, and
+        dict of job id -> number of failed attempts
+    A torn last line, left by a crash in the middle of a write, is ignored.
+    """
+    results = collections.defaultdict(dict)
+    failures = collections.Counter()
+    if not os.path.exists(journal):
+        return results, failures
+    with open(journal, "r", encoding = "utf-8") as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry["type"] == "page":
+                results[entry["job"]][entry["page"]] = entry["tables"]
+            elif entry["type"] == "failure":
+                failures[entry["job"]] += 1
+    return results, failures
+
+
+class RESUMABLE_BATCH:
+    """
+    TODO: Run the jobs of a JSONL file, checkpointing every finished page in a journal
+    ? param jobs_file: Path to the jobs, see `read_jobs`
+    ? param journal: Path to the checkpoint journal, appended to and fsync'd
+        after every entry
+    ? param folder: Folder for the downloaded PDFs and rendered images
+    ? param workers: Number of processes extracting tables, one per CPU when None
+    ? param download_workers: Number of threads downloading PDFs
+    ? param max_attempts: Number of failed attempts after which a job is given up
+    ? param pages_per_task: Pages extracted by one task, so a crash loses at most
+        this many pages of a job
+
+    Restarting with the same journal skips the pages that are already in it
+    and retries the jobs that failed fewer than max_attempts times.
+    """
+    def __init__(self, jobs_file, journal, folder, workers = None, download_workers = 4,
+                 max_attempts = 3, pages_per_task = 8):
+        self.jobs_file = jobs_file
+        self.journal = journal
+        self.folder = folder
+        self.workers = workers
+        self.download_workers = download_workers
+        self.max_attempts = max_attempts
+        self.pages_per_task = pages_per_task
+        self.jobs = read_jobs(jobs_file)
+        self._done = collections.defaultdict(set)
+        self._failures = collections.Counter()
+        self._errors = {}
+        self._journal_file = None
+
+    def _append(self, entry):
+        self._journal_file.write(json.dumps(entry, ensure_ascii = False) + "\n")
+        self._journal_file.flush()
+        os.fsync(self._journal_file.fileno())
+
+    def _open_journal(self):
+        results, self._failures = read_journal(self.journal)
+        for job_id, pages in results.items():
+            self._done[job_id].update(pages)
+        self._journal_file = open(self.journal, "a", encoding = "utf-8")
+        if self._journal_file.tell() > 0:
+            with open(self.journal, "rb") as file:
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b"\n":
+                    # end the torn line so the next entry starts on its own
+                    self._journal_file.write("\n")
+
+    def _pending(self):
+        pending = {}
+        for job_id, job in self.jobs:
+            pages = [page for page in dict.fromkeys(job["page_pdf_list"]) if page not in self._done[job_id]]
+            if pages and self._failures[job_id] < self.max_attempts:
+                if job_id in pending:
+                    pending[job_id][1].extend(page for page in pages if page not in pending[job_id][1])
+                else:
+                    pending[job_id] = (job, pages)
+        return pending
+
+    def _job_folder(self, job_id):
+        return os.path.join(self.folder, "job_" + hashlib.sha256(job_id.encode("utf-8")).hexdigest()[:16])
+
+    def _fail(self, job_id, error):
+        self._failures[job_id] += 1
+        self._errors[job_id] = error
+        self._append({"type": "failure", "job": job_id, "attempt": self._failures[job_id], "error": error})
+        print(f"Job {job_id} failed (attempt {self._failures[job_id]}/{self.max_attempts}): {error}")
+
+    def _run_round(self, pending):
+        remaining, failed = {}, {}
+
+        def download(pdf_downloader, job_id):
+            return pdf_downloader.download(pending[job_id][0]["url"], self._job_folder(job_id))
+
+        def tasks(job_id, file_name):
+            job, pages = pending[job_id]
+            chunks = [pages[start:start + self.pages_per_task] for start in range(0, len(pages), self.pages_per_task)]
+            remaining[job_id] = len(chunks)
+            return [(chunk, _extract_task, job, file_name, chunk, self._job_folder(job_id)) for chunk in chunks]
+
+        def on_result(job_id, chunk, page_tables, error):
+            if chunk is None:
+                return self._fail(job_id, error)
+            if error is None:
+                for page in chunk:
+                    self._append({"type": "page", "job": job_id, "page": page, "tables": page_tables[page]})
+                    self._done[job_id].add(page)
+            else:
+                failed[job_id] = error
+            remaining[job_id] -= 1
+            if not remaining[job_id]:
+                if job_id in failed:
+                    self._fail(job_id, failed[job_id])
+                delete_all_files_in_folder(folder_path = self._job_folder(job_id))
+
+        _run_pipeline(
+            pending, download, tasks, on_result,
+            download_workers = self.download_workers, workers = self.workers
+        )
+
+    def run(self):
+        """
+        TODO: Run every unfinished job, in rounds until each one is done or out of attempts
+        !Returns: Dict with the number of "jobs", finished "pages" and the
+            "failed" jobs with their last error
+        """
+        self._open_journal()
+        try:
+            pending = self._pending()
+            while pending:
+                print(f"Extracting {sum(len(pages) for _, pages in pending.values())} pages of {len(pending)} jobs...")
+                self._run_round(pending)
+                pending = self._pending()
+        finally:
+            self._journal_file.close()
+        failed = {
+            job_id: self._errors.get(job_id, "")
+            for job_id, job in self.jobs
+            if any(page not in self._done[job_id] for page in job["page_pdf_list"])
+        }
+        print("Batch extraction completed successfully." if not failed else f"Batch extraction completed, {len(failed)} jobs failed.")
+        return {"jobs": len(self.jobs), "pages": sum(len(pages) for pages in self._done.values()), "failed": failed}
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Extract the tables of the jobs of a JSONL file, resuming from a journal")
+    parser.add_argument("jobs_file", help = "JSONL file with one {\"url\", \"page_pdf_list\"} job per line")
+    parser.add_argument("--journal", help = "checkpoint journal, <jobs_file>.journal.jsonl by default")
+    parser.add_argument("--folder", default = "pdf_data", help = "folder for the downloaded PDFs and images")
+    parser.add_argument("--workers", type = int, help = "extraction processes, one per CPU by default")
+    parser.add_argument("--download-workers", type = int, default = 4)
+    parser.add_argument("--max-attempts", type = int, default = 3)
+    parser.add_argument("--pages-per-task", type = int, default = 8)
+    args = parser.parse_args(argv)
+    batch = RESUMABLE_BATCH(
+        jobs_file = args.jobs_file,
+        journal = args.journal or os.path.splitext(args.jobs_file)[0] + ".journal.jsonl",
+        folder = args.folder,
+        workers = args.workers,
+        download_workers = args.download_workers,
+        max_attempts = args.max_attempts,
+        pages_per_task = args.pages_per_task
+    )
+    summary = batch.run()
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
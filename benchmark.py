@@ -0,0 +1,299 @@
+"""
+Offline benchmark of the extraction pipeline on synthetic PDFs.
+
+Generates a PDF with ruled tables (merged cells, dense text, many pages),
+times every stage of the pipeline and the end-to-end PDF_TABLE flow, and
+prints the results as JSON. No network is needed.
+
+    python benchmark.py --pages 8 --tables 2 --rows 25 --cols 6 --output bench.json
+    python benchmark.py --baseline bench.json --max-regression 0.25
+    python benchmark.py --threshold find_lines=0.5 --threshold end_to_end_vector=2
+
+The exit code is 1 when a stage is slower than its baseline by more than
+--max-regression, or slower than an absolute --threshold (in seconds).
+Rasterization and the image end-to-end flow need poppler; without it they
+are reported as skipped and the line detection stages run on images drawn
+with OpenCV from the same geometry.
+
+The cold start of the package is measured too, with `python -X importtime`
+in a fresh interpreter per run (`--imports-only` skips the pipeline). The
+heavy dependencies in LAZY_DEPENDENCIES are imported at first use, so
+importing a module only costs numpy (for model) and the standard library.
+Each import is held to IMPORT_BUDGETS, and a LAZY_DEPENDENCIES module
+loaded by a plain import counts as a regression.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import cv2
+import numpy as np
+from generate_layouts import get_pdf_layouts, get_layout_objects, get_ruling_segments
+from generate_images import convert_pdf_to_array, adaptive_threshold
+from generate_text import TextIndex
+from generate_table import Table
+from generate_index_table import get_table_index, get_table_indices
+from utils import find_lines, find_contours, find_joints
+from model import PDF_TABLE, LAYOUT_KWARGS
+from synthetic import PAGE_WIDTH, PAGE_HEIGHT, FONT_SIZE, synthetic_tables, write_pdf
+
+# cold-start budget, in seconds, of `import <module>` in a fresh interpreter
+IMPORT_BUDGETS = {
+    "model": 0.25, # numpy is most of it
+    "generate_layouts": 0.02,
+    "generate_file": 0.02,
+    "cache": 0.05,
+}
+# dependencies only imported by the functions that use them
+LAZY_DEPENDENCIES = ("cv2", "pdfminer", "pdf2image", "httpx")
+
+
+def draw_pages(document, dpi):
+    """
+    TODO: Draw the synthetic pages as grayscale images, the way pdftoppm would render them
+    ?param document: Output of `synthetic_tables`
+    ?param dpi: Resolution of the images
+    """
+    scale = dpi / 72.0
+    images = []
+    for page_tables in document:
+        img = np.full((int(PAGE_HEIGHT * scale), int(PAGE_WIDTH * scale)), 255, dtype = np.uint8)
+        to_px = lambda x, y: (int(round(x * scale)), int(round((PAGE_HEIGHT - y) * scale)))
+        for table in page_tables:
+            for x0, y0, x1, y1 in table["segments"]:
+                cv2.line(img, to_px(x0, y0), to_px(x1, y1), 0, max(1, int(0.5 * scale)))
+            for x, y, text in table["texts"]:
+                cv2.putText(img, text, to_px(x, y), cv2.FONT_HERSHEY_SIMPLEX, FONT_SIZE * scale / 30.0, 0, 1)
+        images.append(img)
+    return images
+
+
+def _time(function, repeat):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        runs.append(time.perf_counter() - start)
+    return runs
+
+
+def run_benchmark(pages = 4, tables = 2, rows = 20, cols = 6, dpi = 300, repeat = 3):
+    """
+    TODO: Time every stage of the pipeline on a synthetic PDF
+    ?param pages: Number of pages
+    ?param tables: Number of tables per page
+    ?param rows: Number of rows per table
+    ?param cols: Number of columns per table
+    ?param dpi: Resolution of the rendered pages
+    ?param repeat: Number of timed runs of every stage
+    !Returns: Dict of stage -> {"runs", "min", "median", "mean"} in seconds,
+        or {"skipped": reason} when a stage cannot run here
+    """
+    document = synthetic_tables(pages, tables, rows, cols)
+    page_numbers = list(range(1, pages + 1))
+    folder = tempfile.mkdtemp(prefix = "tablepdf_bench_")
+    file_name = os.path.join(folder, "synthetic.pdf")
+    write_pdf(file_name, document)
+    results = {}
+
+    def record(stage, function):
+        print(f"Benchmarking {stage}...", file = sys.stderr)
+        try:
+            runs = _time(function, repeat)
+        except Exception as e:
+            results[stage] = {"skipped": f"{type(e).__name__}: {e}"}
+            return
+        results[stage] = {
+            "runs": runs,
+            "min": min(runs),
+            "median": statistics.median(runs),
+            "mean": statistics.mean(runs),
+        }
+
+    record("get_pdf_layouts", lambda: get_pdf_layouts(file_name, **LAYOUT_KWARGS))
+    layouts = get_pdf_layouts(file_name, **LAYOUT_KWARGS)
+
+    record("rasterization", lambda: convert_pdf_to_array(file_name, page_numbers, dpi = dpi))
+    if "skipped" in results["rasterization"]:
+        images = draw_pages(document, dpi)
+    else:
+        images = convert_pdf_to_array(file_name, page_numbers, dpi = dpi)
+
+    record("adaptive_threshold", lambda: [adaptive_threshold(image) for image in images])
+    thresholds = [adaptive_threshold(image)[1] for image in images]
+
+    def detect_lines():
+        return [
+            (find_lines(threshold, direction = "vertical", iterations = 0)[0],
+             find_lines(threshold, direction = "horizontal", iterations = 0)[0])
+            for threshold in thresholds
+        ]
+    record("find_lines", detect_lines)
+    masks = detect_lines()
+
+    def detect_joints():
+        for vertical, horizontal in masks:
+            contours = find_contours(vertical, horizontal)
+            find_joints(contours, vertical, horizontal)
+    record("find_joints", detect_joints)
+
+    # the table stages use the known geometry with the segments and text read from the PDF
+    page_inputs = []
+    for page_pdf, page_tables in zip(page_numbers, document):
+        layout = layouts[f"page_{page_pdf}"]["layout"]
+        v_segments, h_segments = get_ruling_segments(layout)
+        text_index = TextIndex(get_layout_objects(layout)["horizontal_text"])
+        for table in page_tables:
+            page_inputs.append((table, v_segments, h_segments, text_index.in_bbox(table["bbox"])))
+
+    def set_edges():
+        return [
+            Table(table["cols"], table["rows"]).set_edges(v_segments, h_segments).set_border().set_span()
+            for table, v_segments, h_segments, _ in page_inputs
+        ]
+    record("set_edges", set_edges)
+    built = list(zip(set_edges(), (texts for *_, texts in page_inputs)))
+
+    record("get_table_index", lambda: [
+        get_table_index(table, text, "horizontal") for table, texts in built for text in texts
+    ])
+    record("get_table_indices", lambda: [get_table_indices(table, texts) for table, texts in built])
+
+    def end_to_end(mode):
+        pdf_table = PDF_TABLE(
+            url = None, folder = folder, page_pdf_list = page_numbers,
+            in_memory = True, dpi = dpi, mode = mode
+        )
+        return lambda: pdf_table.extract_pages(file_name, page_numbers)
+    record("end_to_end_vector", end_to_end("vector"))
+    record("end_to_end_image", end_to_end("image"))
+
+    os.remove(file_name)
+    os.rmdir(folder)
+    return results
+
+
+def measure_imports(modules = tuple(IMPORT_BUDGETS), repeat = 3):
+    """
+    TODO: Time the import of modules of the package, each in a fresh interpreter
+    ?param modules: Module names
+    ?param repeat: Number of interpreters started per module
+    !Returns: Dict of "import_<module>" -> {"runs", "min", "median", "mean"}
+        in seconds, with the "eager_dependencies" of LAZY_DEPENDENCIES that
+        the import loaded
+    """
+    root = os.path.dirname(os.path.abspath(__file__))
+    check = f"import sys; print(','.join(m for m in {LAZY_DEPENDENCIES!r} if m in sys.modules))"
+    results = {}
+    for module in modules:
+        print(f"Benchmarking import {module}...", file = sys.stderr)
+        runs = []
+        for _ in range(repeat):
+            process = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", f"import {module}; {check}"],
+                cwd = root, capture_output = True, text = True, check = True
+            )
+            # "import time: self [us] | cumulative | imported package"
+            cumulative = [
+                int(line.split("|")[1]) for line in process.stderr.splitlines()
+                if line.startswith("import time:") and line.split("|")[2].strip() == module
+            ]
+            runs.append(cumulative[-1] / 1e6)
+        eager = [name for name in process.stdout.strip().split(",") if name]
+        results[f"import_{module}"] = {
+            "runs": runs,
+            "min": min(runs),
+            "median": statistics.median(runs),
+            "mean": statistics.mean(runs),
+            "eager_dependencies": eager,
+        }
+    return results
+
+
+def find_regressions(results, baseline = None, max_regression = 0.2, thresholds = None):
+    """
+    TODO: Compare the median time of every stage with a baseline and with absolute thresholds
+    ?param results: Output of `run_benchmark`
+    ?param baseline: Stages of an earlier run, as written by this script
+    ?param max_regression: Allowed slowdown relative to the baseline (0.2 is 20%)
+    ?param thresholds: Dict of stage -> maximum median time in seconds
+    !Returns: List of human readable regressions, empty when every stage passes
+    """
+    regressions = []
+    for stage, result in results.items():
+        if "skipped" in result:
+            continue
+        for dependency in result.get("eager_dependencies", []):
+            regressions.append(f"{stage}: imports {dependency} eagerly")
+        median = result["median"]
+        reference = (baseline or {}).get(stage, {}).get("median")
+        if reference and median > reference * (1 + max_regression):
+            regressions.append(
+                f"{stage}: {median:.4f}s is {median / reference - 1:.0%} slower than the baseline {reference:.4f}s"
+            )
+        limit = (thresholds or {}).get(stage)
+        if limit is not None and median > limit:
+            regressions.append(f"{stage}: {median:.4f}s is above the threshold {limit:.4f}s")
+    return regressions
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Benchmark the table extraction pipeline on synthetic PDFs")
+    parser.add_argument("--pages", type = int, default = 4)
+    parser.add_argument("--tables", type = int, default = 2, help = "tables per page")
+    parser.add_argument("--rows", type = int, default = 20)
+    parser.add_argument("--cols", type = int, default = 6)
+    parser.add_argument("--dpi", type = int, default = 300)
+    parser.add_argument("--repeat", type = int, default = 3)
+    parser.add_argument("--imports-only", action = "store_true",
+                        help = "only measure the import time of the package")
+    parser.add_argument("--output", help = "write the JSON results to this file instead of stdout")
+    parser.add_argument("--baseline", help = "JSON results of an earlier run to compare with")
+    parser.add_argument("--max-regression", type = float, default = 0.2,
+                        help = "allowed slowdown relative to the baseline, 0.2 is 20%%")
+    parser.add_argument("--threshold", action = "append", default = [], metavar = "STAGE=SECONDS",
+                        help = "maximum median time of a stage, can be repeated")
+    args = parser.parse_args(argv)
+
+    thresholds = {f"import_{module}": budget for module, budget in IMPORT_BUDGETS.items()}
+    for threshold in args.threshold:
+        stage, _, seconds = threshold.partition("=")
+        thresholds[stage] = float(seconds)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding = "utf-8") as file:
+            baseline = json.load(file)["stages"]
+
+    config = {key: getattr(args, key) for key in ("pages", "tables", "rows", "cols", "dpi", "repeat")}
+    stages = {} if args.imports_only else run_benchmark(**config)
+    stages.update(measure_imports(repeat = args.repeat))
+    regressions = find_regressions(stages, baseline, args.max_regression, thresholds)
+    report = {
+        "config": config,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+        },
+        "stages": stages,
+        "regressions": regressions,
+    }
+    output = json.dumps(report, indent = 2)
+    if args.output:
+        with open(args.output, "w", encoding = "utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+    for regression in regressions:
+        print(f"Regression: {regression}", file = sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import threading
+from generate_file import get_downloader
+
+
+def file_sha256(file_path: str = None, chunk_size: int = 1 << 20):
+    """
+    TODO: Hash a file without reading it into memory at once
+    ? param file_path: Path to the file
+    """
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class _IndexedCache:
+    """
+    TODO: Base of the caches that keep a JSON index of their entries in `folder`
+    """
+    def __init__(self, folder: str = None, max_size: int = None):
+        self.folder = folder
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        os.makedirs(folder, exist_ok = True)
+        self._index_path = os.path.join(folder, "index.json")
+        self._index = self._load_index()
+
+    def _load_index(self):
+        if not os.path.exists(self._index_path):
+            return {}
+        try:
+            with open(self._index_path, "r", encoding = "utf-8") as file:
+                return json.load(file)
+        except ValueError:
+            print(f"Ignoring corrupted cache index {self._index_path}")
+            return {}
+
+    def _save_index(self):
+        tmp_path = self._index_path + ".tmp"
+        with open(tmp_path, "w", encoding = "utf-8") as file:
+            json.dump(self._index, file)
+        os.replace(tmp_path, self._index_path)
+
+
+class PDFCache(_IndexedCache):
+    """
+    TODO: Local cache of downloaded PDF files
+    ? param folder: Folder holding the cached files and their index
+    ? param max_size: Size in bytes above which the least recently used
+        files are evicted
+    ? param downloader: PDFDownloader to use, the shared one when None
+
+    Files are stored once per content hash (`objects/<sha256>.pdf`) and the
+    index maps each URL to its hash, ETag and Last-Modified. A cached URL
+    is revalidated with a conditional request, and a 304 reuses the file
+    without downloading it again.
+    """
+    def __init__(self, folder: str = None, max_size: int = 2 << 30, downloader = None):
+        super().__init__(folder, max_size)
+        self.downloader = downloader
+        os.makedirs(os.path.join(folder, "objects"), exist_ok = True)
+
+    def _object_path(self, sha256: str):
+        return os.path.join(self.folder, "objects", f"{sha256}.pdf")
+
+    def _evict(self, keep: str = None):
+        """
+        TODO: Drop least recently used URLs until the cache fits in max_size
+        ? param keep: URL that must stay cached
+        A file is only deleted once no URL refers to its hash anymore.
+        """
+        sizes = {entry["sha256"]: entry["size"] for entry in self._index.values()}
+        total_size = sum(sizes.values())
+        for url in sorted(self._index, key = lambda url: self._index[url]["last_used"]):
+            if total_size <= self.max_size:
+                break
+            if url == keep:
+                continue
+            sha256 = self._index.pop(url)["sha256"]
+            if all(entry["sha256"] != sha256 for entry in self._index.values()):
+                total_size -= sizes[sha256]
+                try:
+                    os.remove(self._object_path(sha256))
+                except FileNotFoundError:
+                    pass
+
+    def _checkout(self, sha256: str, url: str, folder: str = None):
+        """
+        TODO: Give the caller its own path to a cached file, called with the lock held
+        ? param sha256: Content hash of the file
+        ? param url: URL of the file, whose last part names the copy
+        ? param folder: Folder of the copy, the cached file itself is returned when None
+        The copy is a hard link when the folder is on the same file system,
+        so eviction can delete the cached file while a job still reads it.
+        """
+        object_path = self._object_path(sha256)
+        if folder is None:
+            return object_path
+        os.makedirs(folder, exist_ok = True)
+        file_path = os.path.join(folder, url.split("/")[-1] or f"{sha256}.pdf")
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        try:
+            os.link(object_path, file_path)
+        except OSError:
+            shutil.copyfile(object_path, file_path)
+        return file_path
+
+    def download(self, url: str = None, folder: str = None):
+        """
+        TODO: Return the path of an up-to-date copy of the PDF at `url`
+        ? param url: URL of the PDF file
+        ? param folder: Folder in which the file is linked for the caller,
+            see `_checkout`. Without it the cached file is returned, and
+            may be evicted by a later download.
+        Raises httpx.HTTPError when the file cannot be downloaded.
+        """
+        downloader = self.downloader or get_downloader()
+        with self._lock:
+            entry = dict(self._index.get(url, {}))
+        headers = {}
+        if entry and os.path.exists(self._object_path(entry["sha256"])):
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        part_path = os.path.join(self.folder, f"{uuid.uuid4().hex}.download")
+        try:
+            response = downloader.fetch(url = url, file_path = part_path, headers = headers)
+            if response.status_code == 304:
+                with self._lock:
+                    if url in self._index:
+                        self._index[url]["last_used"] = time.time()
+                        self._save_index()
+                    if os.path.exists(self._object_path(entry["sha256"])):
+                        return self._checkout(entry["sha256"], url, folder)
+                # evicted since the request, download it again
+                return self.download(url = url, folder = folder)
+
+            sha256 = file_sha256(part_path)
+            object_path = self._object_path(sha256)
+            os.replace(part_path, object_path)
+        finally:
+            # leftovers of a failed download are not in the index, so eviction would never remove them
+            for path in (part_path, part_path + ".part"):
+                if os.path.exists(path):
+                    os.remove(path)
+        with self._lock:
+            self._index[url] = {
+                "sha256": sha256,
+                "size": os.path.getsize(object_path),
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "last_used": time.time(),
+            }
+            self._evict(keep = url)
+            self._save_index()
+            return self._checkout(sha256, url, folder)
+
+
+class ResultCache:
+    """
+    TODO: On-disk cache of extracted tables
+    ? param folder: Folder holding the cached results
+    ? param max_size: Size in bytes above which the least recently used
+        results are evicted
+
+    A result is keyed by the content hash of the PDF, the page number and
+    every parameter that changes the extraction, so a cached page is only
+    reused when extracting it again would give the same tables.
+
+    There is no index file: the modification time of a result is its
+    last use, touched on every hit, and the sizes are read from the
+    results folder once. A hit or a store never rewrites shared state,
+    and the least recently used results are only looked up when the
+    cache goes over max_size.
+    """
+    VERSION = 3 # bumped whenever the layout of a cached result changes
+    EVICT_TO = 0.9 # eviction goes below max_size, so it does not run again on the next store
+
+    def __init__(self, folder: str = None, max_size: int = 512 << 20):
+        self.folder = folder
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(folder, "results"), exist_ok = True)
+        self._sizes = {}
+        with os.scandir(os.path.join(folder, "results")) as entries:
+            for entry in entries:
+                if entry.name.endswith(".json"):
+                    self._sizes[entry.name[:-len(".json")]] = entry.stat().st_size
+        self._total_size = sum(self._sizes.values())
+
+    @staticmethod
+    def key(pdf_sha256: str = None, page: int = None, params: dict = None):
+        """
+        TODO: Build the cache key of a page
+        ? param pdf_sha256: Content hash of the PDF file
+        ? param page: Page number
+        ? param params: Extraction parameters (layout kwargs, DPI, tolerances...)
+        """
+        key = json.dumps(
+            {"version": ResultCache.VERSION, "pdf": pdf_sha256, "page": page, "params": params},
+            sort_keys = True
+        )
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _result_path(self, key: str):
+        return os.path.join(self.folder, "results", f"{key}.json")
+
+    def _remove(self, key: str):
+        # called with the lock held
+        self._total_size -= self._sizes.pop(key, 0)
+        try:
+            os.remove(self._result_path(key))
+        except FileNotFoundError:
+            pass
+
+    def get(self, key: str = None):
+        """
+        TODO: Return the cached result of `key`, or None when it is not cached
+        """
+        result_path = self._result_path(key)
+        try:
+            with open(result_path, "r", encoding = "utf-8") as file:
+                data = json.load(file)
+            os.utime(result_path) # last use, read by _evict
+        except FileNotFoundError:
+            return None # never stored, or evicted meanwhile
+        except (OSError, ValueError):
+            with self._lock:
+                self._remove(key)
+            return None
+        return data
+
+    def _evict(self, keep: str = None):
+        """
+        TODO: Drop least recently used results until the cache fits in EVICT_TO * max_size
+        ? param keep: Key that must stay cached
+        Called with the lock held.
+        """
+        last_used = {}
+        for key in self._sizes:
+            try:
+                last_used[key] = os.stat(self._result_path(key)).st_mtime
+            except FileNotFoundError:
+                last_used[key] = 0
+        for key in sorted(last_used, key = last_used.get):
+            if self._total_size <= self.max_size * self.EVICT_TO:
+                break
+            if key != keep:
+                self._remove(key)
+
+    def set(self, key: str = None, data = None):
+        """
+        TODO: Store the result of `key` and evict the least recently used results
+        """
+        result_path = self._result_path(key)
+        tmp_path = f"{result_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding = "utf-8") as file:
+            json.dump(data, file, ensure_ascii = False)
+        size = os.path.getsize(tmp_path)
+        with self._lock:
+            os.replace(tmp_path, result_path)
+            self._total_size += size - self._sizes.get(key, 0)
+            self._sizes[key] = size
+            if self._total_size > self.max_size:
+                self._evict(keep = key)
@@ -0,0 +1,237 @@
+"""
+Deterministic check of the vectorized table code against the per-line
+code it replaced.
+
+    python check_equivalence.py --cases 1000 --seed 0
+
+Random tables, segments and text lines are run through both versions of
+every rewrite and the results are compared exactly:
+
+    set_edges                           Table.set_edges vs the per-line loops
+    get_table_indices, reduce_indices   vs get_table_index and reduce_index
+    merge_close_lines_batch             vs the per-line moving mean
+    TextIndex, SegmentIndex             vs text_in_bbox and segments_in_bbox
+
+The per-line versions that are no longer in the tree are kept below as
+reference functions. The exit code is 1 when any case differs. Run it
+after changing one of these functions, and benchmark.py for their speed.
+"""
+import argparse
+import sys
+import warnings
+import numpy as np
+from generate_table import Table
+from generate_index_table import get_table_index, get_table_indices, reduce_index, reduce_indices
+from generate_text import TextIndex, SegmentIndex, text_in_bbox, segments_in_bbox
+from utils import merge_close_lines_batch
+
+
+class _Text:
+    # the attributes of a pdfminer text line read by the table code
+    def __init__(self, x0, y0, x1, y1, text):
+        self.x0, self.y0, self.x1, self.y1 = x0, y0, x1, y1
+        self._text = text
+
+    def get_text(self):
+        return self._text
+
+
+def reference_set_edges(cols, rows, vertical, horizontal, joint_tol = 2):
+    """
+    TODO: Per-line Table.set_edges, as it was before the searchsorted rewrite
+    !Returns: left, right, top and bottom boolean arrays of shape (rows, cols)
+    """
+    grid = (len(rows), len(cols))
+    left, right, top, bottom = (np.zeros(grid, dtype = bool) for _ in range(4))
+    for v in vertical:
+        i = [i for i, t in enumerate(cols) if np.isclose(v[0], t[0], atol = joint_tol)]
+        j = [j for j, t in enumerate(rows) if np.isclose(v[3], t[0], atol = joint_tol)]
+        k = [k for k, t in enumerate(rows) if np.isclose(v[1], t[0], atol = joint_tol)]
+        if not j:
+            continue
+        J = j[0]
+        K = k[0] if k else len(rows)
+        while J < K:
+            if i == [0]:
+                left[J][i[0]] = True
+            elif i == []:
+                right[J][len(cols) - 1] = True
+            else:
+                left[J][i[0]] = True
+                right[J][i[0] - 1] = True
+            J += 1
+    for h in horizontal:
+        i = [i for i, t in enumerate(rows) if np.isclose(h[1], t[0], atol = joint_tol)]
+        j = [j for j, t in enumerate(cols) if np.isclose(h[0], t[0], atol = joint_tol)]
+        k = [k for k, t in enumerate(cols) if np.isclose(h[2], t[0], atol = joint_tol)]
+        if not j:
+            continue
+        J = j[0]
+        K = k[0] if k else len(cols)
+        while J < K:
+            if i == [0]:
+                top[i[0]][J] = True
+            elif i == []:
+                bottom[len(rows) - 1][J] = True
+            else:
+                top[i[0]][J] = True
+                bottom[i[0] - 1][J] = True
+            J += 1
+    return left, right, top, bottom
+
+
+def reference_merge_close_lines(ar, line_tol = 2):
+    """
+    TODO: Per-line merge_close_lines, as it was before the batched rewrite
+    """
+    ret = []
+    for a in ar:
+        if not ret:
+            ret.append(a)
+        else:
+            temp = ret[-1]
+            if np.isclose(temp, a, atol = line_tol):
+                ret[-1] = (temp + a) / 2.0
+            else:
+                ret.append(a)
+    return ret
+
+
+def _random_grid(rng):
+    n_cols, n_rows = rng.integers(1, 8), rng.integers(1, 10)
+    xs = np.cumsum(rng.uniform(1, 60, n_cols + 1)) + rng.uniform(0, 100)
+    ys = np.cumsum(rng.uniform(1, 30, n_rows + 1)) + rng.uniform(0, 100)
+    if rng.random() < 0.3:
+        # boundaries 3 apart, where one line end matches several of them,
+        # without the zero-size cells merge_close_lines never leaves
+        xs, ys = np.unique(np.round(xs / 3) * 3), np.unique(np.round(ys / 3) * 3)
+        if len(xs) < 2 or len(ys) < 2:
+            xs, ys = np.array([0.0, 3.0]), np.array([0.0, 3.0])
+    ys = ys[::-1]
+    cols = [(float(xs[c]), float(xs[c + 1])) for c in range(len(xs) - 1)]
+    rows = [(float(ys[r]), float(ys[r + 1])) for r in range(len(ys) - 1)]
+    return cols, rows, xs, ys
+
+
+def _random_segments(rng, xs, ys, count):
+    def near(values):
+        # a boundary within or just outside the tolerance, or anywhere
+        if rng.random() < 0.15:
+            return float(rng.uniform(values.min() - 20, values.max() + 20))
+        return float(rng.choice(values) + rng.choice([0, 0, 0.5, -1.5, 2.0, 2.5, -3]))
+    vertical, horizontal = [], []
+    for _ in range(count):
+        y0, y1 = sorted((near(ys), near(ys)))
+        vertical.append((near(xs), y0, near(xs), y1))
+        x0, x1 = sorted((near(xs), near(xs)))
+        horizontal.append((x0, near(ys), x1, near(ys)))
+    return vertical, horizontal
+
+
+def _random_texts(rng, xs, ys, count):
+    texts = []
+    for index in range(count):
+        x0 = float(rng.uniform(xs.min() - 10, xs.max()))
+        y0 = float(rng.uniform(ys.min() - 5, ys.max()))
+        x1 = x0 + float(rng.choice([0, rng.uniform(1, 80)]))
+        y1 = y0 + float(rng.choice([0, rng.uniform(1, 12)]))
+        texts.append(_Text(x0, y0, x1, y1, f"t{index}\n"))
+    return texts
+
+
+def check_set_edges(rng):
+    cols, rows, xs, ys = _random_grid(rng)
+    vertical, horizontal = _random_segments(rng, xs, ys, rng.integers(0, 25))
+    joint_tol = float(rng.choice([1, 2, 3]))
+    table = Table(cols, rows).set_edges(vertical, horizontal, joint_tol = joint_tol)
+    expected = reference_set_edges(cols, rows, vertical, horizontal, joint_tol = joint_tol)
+    return all(np.array_equal(a, b) for a, b in zip((table.left, table.right, table.top, table.bottom), expected))
+
+
+def check_table_indices(rng):
+    cols, rows, xs, ys = _random_grid(rng)
+    vertical, horizontal = _random_segments(rng, xs, ys, rng.integers(0, 25))
+    table = Table(cols, rows).set_edges(vertical, horizontal).set_border().set_span()
+    texts = _random_texts(rng, xs, ys, rng.integers(0, 30))
+    r_idx, c_idx, errors = get_table_indices(table, texts)
+    expected = [get_table_index(table, t, "horizontal") for t in texts]
+    if [(r, c) for (((r, c, _),), _) in expected] != list(zip(r_idx.tolist(), c_idx.tolist())):
+        return False
+    if not np.array_equal(errors, np.array([error for _, error in expected], dtype = float).reshape(-1)):
+        return False
+    shift_text = ["b", "t"] if rng.random() < 0.5 else list(rng.permutation(["l", "r", "t", "b"]))
+    reduced = reduce_index(table, [idx[0] for idx, _ in expected], shift_text)
+    r_new, c_new = reduce_indices(table, r_idx, c_idx, shift_text)
+    return [(r % len(rows), c % len(cols)) for r, c, _ in reduced] == list(zip(r_new.tolist(), c_new.tolist()))
+
+
+def check_merge_close_lines(rng):
+    arrays = []
+    for _ in range(rng.integers(1, 6)):
+        values = np.cumsum(rng.choice([0.0, 0.5, 1.5, 2.0, 2.5, 4.0, 10.0], rng.integers(0, 15)))
+        values = values + rng.uniform(0, 500)
+        if rng.random() < 0.5:
+            values = values[::-1]
+        if rng.random() < 0.1:
+            values = rng.permutation(values)
+        arrays.append(values.tolist())
+    line_tol = float(rng.choice([1, 2, 3]))
+    return merge_close_lines_batch(arrays, line_tol = line_tol) == [
+        reference_merge_close_lines(ar, line_tol = line_tol) for ar in arrays
+    ]
+
+
+def check_bbox_indices(rng):
+    cols, rows, xs, ys = _random_grid(rng)
+    vertical, horizontal = _random_segments(rng, xs, ys, rng.integers(0, 40))
+    texts = _random_texts(rng, xs, ys, rng.integers(0, 40))
+    text_index, segment_index = TextIndex(texts), SegmentIndex(vertical, horizontal)
+    for _ in range(3):
+        x0, x1 = sorted(rng.uniform(xs.min() - 10, xs.max() + 10, 2).tolist())
+        y0, y1 = sorted(rng.uniform(ys.min() - 10, ys.max() + 10, 2).tolist())
+        bbox = (x0, y0, x1, y1)
+        if text_index.in_bbox(bbox) != text_in_bbox(bbox, texts):
+            return False
+        if segment_index.in_bbox(bbox) != segments_in_bbox(bbox, vertical, horizontal):
+            return False
+    return True
+
+
+CHECKS = {
+    "set_edges": check_set_edges,
+    "table_indices": check_table_indices,
+    "merge_close_lines": check_merge_close_lines,
+    "bbox_indices": check_bbox_indices,
+}
+
+
+def run_checks(cases = 1000, seed = 0):
+    """
+    TODO: Run every check on `cases` random inputs
+    ?param cases: Number of random inputs per check
+    ?param seed: Seed of the inputs, the same seed gives the same inputs
+    !Returns: Dict of check name -> list of the failing case numbers
+    """
+    failures = {}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore") # text outside the columns warns in both versions
+        for name, check in CHECKS.items():
+            rng = np.random.default_rng(seed)
+            failures[name] = [case for case in range(cases) if not check(rng)]
+    return failures
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Compare the vectorized table code with the per-line code it replaced")
+    parser.add_argument("--cases", type = int, default = 1000, help = "random inputs per check")
+    parser.add_argument("--seed", type = int, default = 0)
+    args = parser.parse_args(argv)
+    failures = run_checks(args.cases, args.seed)
+    for name, failed in failures.items():
+        status = "ok" if not failed else f"{len(failed)} mismatches, first at case {failed[0]}"
+        print(f"{name}: {args.cases} cases, {status}")
+    return 1 if any(failures.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
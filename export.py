@@ -0,0 +1,203 @@
+import csv
+import json
+from abc import ABC, abstractmethod
+import numpy as np
+
+# one row per cell in the columnar exports
+CELL_COLUMNS = ("page", "order", "row", "column", "text")
+
+
+def table_cell_columns(tables):
+    """
+    TODO: Flatten tables into one column per field of CELL_COLUMNS
+    ?param tables: Structured table results, as yielded by `PDF_TABLE.iter_results`
+    !Returns: Dict of column name -> numpy array (list for "text"), one
+        entry per cell in row-major order
+    """
+    pages, orders, rows, columns, texts = [], [], [], [], []
+    for table in tables:
+        n_rows, n_cols = table["shape"]
+        size = n_rows * n_cols
+        pages.append(np.full(size, table["page"], dtype=np.int32))
+        orders.append(np.full(size, table["order"], dtype=np.int32))
+        rows.append(np.repeat(np.arange(n_rows, dtype=np.int32), n_cols))
+        columns.append(np.tile(np.arange(n_cols, dtype=np.int32), n_rows))
+        for row in table["cells"]:
+            texts.extend(row)
+    empty = np.zeros(0, dtype=np.int32)
+    return {
+        "page": np.concatenate(pages) if pages else empty,
+        "order": np.concatenate(orders) if orders else empty,
+        "row": np.concatenate(rows) if rows else empty,
+        "column": np.concatenate(columns) if columns else empty,
+        "text": texts
+    }
+
+
+def to_dataframe(tables):
+    """
+    TODO: Build a pandas DataFrame with one row per cell of the tables
+    ?param tables: Structured table results
+    """
+    import pandas as pd
+    return pd.DataFrame(table_cell_columns(tables), columns = list(CELL_COLUMNS))
+
+
+class TableExporter(ABC):
+    """
+    TODO: Base of the streaming exporters, tables are buffered and written in batches
+    ?param path: Path to the output file
+    ?param batch_size: Number of cells buffered before a batch is written
+
+    Use it as a context manager, or call `close` so the last batch is
+    written:
+
+        with CSVExporter("tables.csv") as exporter:
+            exporter.write_all(pdf_table.iter_results())
+    """
+    def __init__(self, path: str = None, batch_size: int = 100000):
+        self.path = path
+        self.batch_size = batch_size
+        self._batch = []
+        self._batch_cells = 0
+        self.tables_written = 0
+        self.cells_written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, table):
+        """
+        TODO: Add a table to the current batch, writing the batch once it is full
+        ?param table: Structured table result
+        """
+        self._batch.append(table)
+        self._batch_cells += table["shape"][0] * table["shape"][1]
+        if self._batch_cells >= self.batch_size:
+            self.flush()
+
+    def write_all(self, tables):
+        """
+        TODO: Write every table of an iterable, as it arrives
+        ?param tables: Iterable of structured table results
+        """
+        for table in tables:
+            self.write(table)
+        self.flush()
+        return self.tables_written
+
+    def flush(self):
+        """
+        TODO: Write the buffered tables
+        """
+        if not self._batch:
+            return
+        self._write_batch(self._batch)
+        self.tables_written += len(self._batch)
+        self.cells_written += self._batch_cells
+        self._batch = []
+        self._batch_cells = 0
+
+    @abstractmethod
+    def _write_batch(self, tables):
+        """
+        TODO: Write a batch of buffered tables to the output
+        ?param tables: List of structured table results
+        """
+
+    def close(self):
+        """
+        TODO: Write the last batch and close the output file
+        """
+        self.flush()
+
+
+class CSVExporter(TableExporter):
+    """
+    TODO: Stream tables to a CSV file with one line per cell (CELL_COLUMNS)
+    ?param path: Path to the CSV file
+    ?param batch_size: Number of cells buffered before a batch is written
+    """
+    def __init__(self, path: str = None, batch_size: int = 100000):
+        super().__init__(path, batch_size)
+        self._file = open(path, "w", newline = "", encoding = "utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(CELL_COLUMNS)
+
+    def _write_batch(self, tables):
+        columns = table_cell_columns(tables)
+        self._writer.writerows(zip(
+            columns["page"].tolist(),
+            columns["order"].tolist(),
+            columns["row"].tolist(),
+            columns["column"].tolist(),
+            columns["text"]
+        ))
+
+    def close(self):
+        if self._file.closed:
+            return
+        super().close()
+        self._file.close()
+
+
+class JSONLExporter(TableExporter):
+    """
+    TODO: Stream tables to a JSON Lines file with one structured result per line
+    ?param path: Path to the JSONL file
+    ?param batch_size: Number of cells buffered before a batch is written
+    """
+    def __init__(self, path: str = None, batch_size: int = 100000):
+        super().__init__(path, batch_size)
+        self._file = open(path, "w", encoding = "utf-8")
+
+    def _write_batch(self, tables):
+        self._file.write("".join(json.dumps(table, ensure_ascii = False) + "\n" for table in tables))
+
+    def close(self):
+        if self._file.closed:
+            return
+        super().close()
+        self._file.close()
+
+
+class ParquetExporter(TableExporter):
+    """
+    TODO: Stream tables to a Parquet file with one row per cell (CELL_COLUMNS)
+    ?param path: Path to the Parquet file
+    ?param batch_size: Number of cells per row group
+
+    Needs pyarrow. Every batch is handed to pyarrow as whole columns and
+    becomes one row group, without building a Python object per cell.
+    """
+    def __init__(self, path: str = None, batch_size: int = 100000):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("ParquetExporter needs pyarrow, install it with `pip install pyarrow`")
+        super().__init__(path, batch_size)
+        self._pa = pa
+        self._schema = pa.schema([
+            ("page", pa.int32()),
+            ("order", pa.int32()),
+            ("row", pa.int32()),
+            ("column", pa.int32()),
+            ("text", pa.string())
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def _write_batch(self, tables):
+        columns = table_cell_columns(tables)
+        batch = self._pa.Table.from_pydict(columns, schema = self._schema)
+        self._writer.write_table(batch)
+
+    def close(self):
+        if self._writer is None:
+            return
+        super().close()
+        self._writer.close()
+        self._writer = None
@@ -1,22 +1,126 @@
 import os
-import requests
+import time
+# httpx is imported when the first downloader is created
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+class PDFDownloader:
+    """
+    TODO: Download PDF files through one pooled httpx client
+    ? param connect_timeout: Seconds to wait for a connection
+    ? param read_timeout: Seconds to wait for each chunk of the response
+    ? param retries: Number of retries after a connection error, a timeout
+        or a 429/5xx status
+    ? param backoff: Seconds to wait before the first retry, doubled after each one
+    ? param chunk_size: Size of the chunks written to disk, which bounds memory use
+    ? param client: httpx.Client to use instead of a new one (e.g. with a mock transport)
+    """
+    def __init__(self, connect_timeout: float = 10.0, read_timeout: float = 60.0, retries: int = 3,
+                 backoff: float = 0.5, chunk_size: int = 1 << 16, client = None):
+        self.retries = retries
+        self.backoff = backoff
+        self.chunk_size = chunk_size
+        if client is None:
+            import httpx
+            client = httpx.Client(
+                follow_redirects = True,
+                timeout = httpx.Timeout(read_timeout, connect = connect_timeout)
+            )
+        self.client = client
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.client.close()
+
+    def _stream_to_file(self, url, file_path, headers = None):
+        """
+        TODO: Stream the response body to `file_path` chunk by chunk
+        The body is written to a `.part` file first, so an interrupted
+        download never leaves a truncated PDF behind. Nothing is written
+        for a 304 Not Modified response.
+        """
+        part_path = file_path + ".part"
+        with self.client.stream("GET", url, headers = headers) as response:
+            if response.status_code in RETRY_STATUS_CODES or response.status_code == 304:
+                return response
+            response.raise_for_status()
+            try:
+                with open(part_path, "wb") as file:
+                    for chunk in response.iter_bytes(chunk_size = self.chunk_size):
+                        file.write(chunk)
+            except BaseException:
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+                raise
+        os.replace(part_path, file_path)
+        return response
+
+    def fetch(self, url: str = None, file_path: str = None, headers: dict = None):
+        """
+        TODO: Download a URL to `file_path`, retrying transient failures
+        ? param url: URL of the PDF file
+        ? param file_path: Path to save the PDF file
+        ? param headers: Extra request headers, e.g. conditional ones
+        !Returns: The final httpx.Response, whose status is 304 when a
+            conditional request found the file unchanged
+        Raises httpx.HTTPError once the retries are exhausted.
+        """
+        import httpx
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            try:
+                response = self._stream_to_file(url, file_path, headers = headers)
+            except httpx.TransportError:
+                if last_attempt:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUS_CODES:
+                    return response
+                if last_attempt:
+                    response.raise_for_status()
+            time.sleep(self.backoff * 2 ** attempt)
+
+    def download(self, url: str = None, folder: str = None):
+        """
+        TODO: Download a PDF file from a given URL and save it to a folder
+        ? param url: URL of the PDF file
+        ? param folder: Folder to save the PDF file
+        Raises httpx.HTTPError once the retries are exhausted.
+        """
+        os.makedirs(folder, exist_ok = True)
+        file_name = url.split("/")[-1]
+        file_path = os.path.join(folder, file_name)
+        self.fetch(url = url, file_path = file_path)
+        return file_path
+
+_downloader = None
+
+def get_downloader():
+    """
+    TODO: Return the downloader shared by every `download_pdf` call and PDF_TABLE
+    """
+    global _downloader
+    if _downloader is None:
+        _downloader = PDFDownloader()
+    return _downloader
 
 def download_pdf(url: str = None, folder: str = None):
     """
     TODO: Download a PDF file from a given URL and save it to a folder
     ? param url: URL of the PDF file
     ? param folder: Folder to save the PDF file
+    Returns None when the download fails after retries.
     """
-    if not os.path.exists(folder):
-        print(f"not folder is {folder}")
-    response = requests.get(url)
-    if response.status_code == 200:
-        file_name = url.split("/")[-1]
-        file_path = os.path.join(folder, file_name)
-        with open(file_path, "wb") as file:
-            file.write(response.content)
-            return file_path
-    else:
+    import httpx
+    try:
+        return get_downloader().download(url = url, folder = folder)
+    except httpx.HTTPError as e:
+        print(f"Failed to download {url}. Reason: {e}")
         return None
 
 def delete_all_files_in_folder(folder_path: str = None):
@@ -1,37 +1,147 @@
-from pdf2image import convert_from_path
+from concurrent.futures import ThreadPoolExecutor
 import os
-import cv2
 import numpy as np
+# pdf2image and cv2 are imported at first use, see `convert_pdf_to_img` and `adaptive_threshold`
 
+POPPLER_PATH = r"poppler-24.02.0\Library\bin"
+
+def get_page_ranges(pages: list) -> list:
+    """
+    TODO: Group page numbers into the fewest contiguous ranges
+    ?param pages: Page numbers, in any order and possibly repeated
+    !Returns: List of (first_page, last_page) tuples in ascending order
+    """
+    ranges = []
+    for page in sorted(set(pages)):
+        if ranges and page == ranges[-1][1] + 1:
+            ranges[-1][1] = page
+        else:
+            ranges.append([page, page])
+    return [tuple(page_range) for page_range in ranges]
+
+def get_page_batches(pages: list, max_pages: int = None) -> list:
+    """
+    TODO: Split pages into batches of consecutive pages, keeping the order they are requested in
+    ?param pages: Page numbers
+    ?param max_pages: Maximum number of pages in a batch, no maximum when None
+    !Returns: List of page lists, each one rendered by a single poppler call
+    """
+    batches = []
+    for page in pages:
+        if batches and page == batches[-1][-1] + 1 and (max_pages is None or len(batches[-1]) < max_pages):
+            batches[-1].append(page)
+        else:
+            batches.append([page])
+    return batches
+
+def _render_pages(render_range, pages: list, thread_count: int = 1) -> list:
+    """
+    TODO: Render pages with one poppler call per contiguous page range
+    ?param render_range: Function (first_page, last_page) -> {page: image}
+    ?param pages: Pages to render
+    ?param thread_count: Number of ranges rendered at the same time
+    !Returns: Rendered images in the order of `pages`
+    """
+    page_ranges = get_page_ranges(pages)
+    rendered = {}
+    if thread_count > 1 and len(page_ranges) > 1:
+        with ThreadPoolExecutor(max_workers = thread_count) as executor:
+            for result in executor.map(lambda page_range: render_range(*page_range), page_ranges):
+                rendered.update(result)
+    else:
+        for first_page, last_page in page_ranges:
+            rendered.update(render_range(first_page, last_page))
+    return [rendered.get(page) for page in pages]
+
+def _page_from_filename(path_img: str) -> int:
+    # pdftoppm names its output files `<output_file>-<page>.<ext>`
+    return int(os.path.splitext(os.path.basename(path_img))[0].rsplit("-", 1)[1])
+
+def convert_pdf_to_img(file_name: str = None, folder: str = None, pages: list = None,
+                       thread_count: int = 1, dpi: int = 300) -> list:
+    """
+    TODO: Render pages of a PDF file to PNG files
+    ?param file_name: Path to the PDF file
+    ?param folder: Folder to save the images
+    ?param pages: Pages to render, all pages when empty
+    ?param thread_count: Number of page ranges rendered at the same time
+    ?param dpi: Resolution of the images
+    !Returns: Paths of the images, in the order of `pages`
+    """
+    from pdf2image import convert_from_path
+    output_file = os.path.basename(file_name).split(".")[0]
+
+    def render_range(first_page, last_page):
+        paths = convert_from_path(
+            file_name, dpi=dpi,
+            output_folder = folder, fmt='png',
+            poppler_path = POPPLER_PATH,
+            # the range in the prefix keeps files of other ranges from being picked up
+            output_file = f"{output_file}_{first_page}_{last_page}_",
+            first_page=first_page,
+            last_page=last_page,
+            paths_only=True
+        )
+        return {_page_from_filename(path): path for path in paths}
 
-def convert_pdf_to_img(file_name: str = None, folder: str = None, pages: list = None) -> list:
-    output_path_list = []
-    
     if pages:
-        for page in pages:    
-            images = convert_from_path(
-                file_name, dpi=300, 
-                output_folder = folder, fmt='png',
-                poppler_path = r"poppler-24.02.0\Library\bin",
-                output_file = os.path.basename(file_name).split(".")[0],
-                first_page=page,
-                last_page=page
-            )
-        print([image.filename for image in images])
-        output_path_list.extend([image.filename for image in images])
-    else:      
-        images = convert_from_path(file_name, dpi=300, 
-                output_folder = folder, fmt='png',
-                poppler_path = r"poppler-24.02.0\Library\bin",
-                output_file = os.path.basename(file_name).split(".")[0])
-    
-        output_path_list.extend([image.filename for image in images])
-        
-    return output_path_list
+        return _render_pages(render_range, pages, thread_count)
+
+    return convert_from_path(file_name, dpi=dpi,
+            output_folder = folder, fmt='png',
+            poppler_path = POPPLER_PATH,
+            output_file = output_file,
+            paths_only=True)
+
+def convert_pdf_to_array(file_name: str = None, pages: list = None, thread_count: int = 1,
+                         dpi: int = 300) -> list:
+    """
+    TODO: Render pages of a PDF file to numpy arrays, without writing images to disk
+    ?param file_name: Path to the PDF file
+    ?param pages: Pages to render, all pages when empty
+    ?param thread_count: Number of page ranges rendered at the same time
+    ?param dpi: Resolution of the images
+    Pages are piped from pdftoppm's stdout as raw PGM, so the returned
+    arrays are 2D grayscale images that `adaptive_threshold` accepts as is.
+    """
+    from pdf2image import convert_from_path
+
+    def render_range(first_page, last_page):
+        images = convert_from_path(
+            file_name, dpi=dpi,
+            fmt='ppm', grayscale=True,
+            poppler_path = POPPLER_PATH,
+            first_page=first_page,
+            last_page=last_page
+        )
+        return {
+            first_page + index: np.asarray(image)
+            for index, image in enumerate(images)
+        }
+
+    if pages:
+        return _render_pages(render_range, pages, thread_count)
+
+    images = convert_from_path(file_name, dpi=dpi,
+            fmt='ppm', grayscale=True,
+            poppler_path = POPPLER_PATH)
+    return [np.asarray(image) for image in images]
 
 def adaptive_threshold(image_file, process_background = False, blocksize = 15, c = -2):
-    img = cv2.imread(image_file)
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    """
+    TODO: Threshold a page image before line detection
+    ?param image_file: Path to the image, or the image itself as a numpy
+        array (2D grayscale or 3D BGR)
+    """
+    import cv2
+    if isinstance(image_file, np.ndarray):
+        img = image_file
+    else:
+        img = cv2.imread(image_file)
+    if img.ndim == 2:
+        gray = img
+    else:
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
     if process_background:
         threshold = cv2.adaptiveThreshold(
@@ -39,7 +149,7 @@ def adaptive_threshold(image_file, process_background = False, blocksize = 15, c
         )
     else:
         threshold = cv2.adaptiveThreshold(
-            np.invert(gray),
+            cv2.bitwise_not(gray),
             255,
             cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
             cv2.THRESH_BINARY,
@@ -1,5 +1,6 @@
 import re
 import warnings
+import numpy as np
 from generate_text import flag_font_size, split_textline
 
 def text_strip(text, strip=""):
@@ -89,6 +90,75 @@ def get_table_index(
             return [(r_idx, c_idx, text_strip(t.get_text(), strip_text))], error
 
 
+def get_table_indices(table, texts):
+    """Batch version of `get_table_index` (without split_text and
+    flag_size) for all the text objects of a table at once.
+
+    Rows are found with `searchsorted` on the row tops, which expects
+    rows ordered from top to bottom as PDF_TABLE builds them, and columns
+    with a vectorized overlap over every (text, column) pair.
+
+    Parameters
+    ----------
+    table : generate_table.Table
+    texts : list
+        List of PDFMiner text objects.
+
+    Returns
+    -------
+    r_idx : numpy.ndarray
+        Row index of each text, -1 when it lies in no row.
+    c_idx : numpy.ndarray
+        Column index of each text, -1 when it lies in no row.
+    error : numpy.ndarray
+        Assignment error of each text, as computed by `get_table_index`.
+
+    """
+    n = len(texts)
+    if n == 0:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int), np.zeros(0)
+    x0, y0, x1, y1 = np.array([(t.x0, t.y0, t.x1, t.y1) for t in texts], dtype=float).T
+    rows = np.array(table.rows, dtype=float).reshape(-1, 2)
+    cols = np.array(table.cols, dtype=float).reshape(-1, 2)
+
+    # the row holding the centre is the last one whose top is above it
+    cy = (y0 + y1) / 2.0
+    r_idx = np.searchsorted(-rows[:, 0], -cy, side="left") - 1
+    found = (r_idx >= 0) & (rows[r_idx, 1] < cy)
+    r_idx = np.where(found, r_idx, -1)
+
+    overlap = (cols[None, :, 0] <= x1[:, None]) & (cols[None, :, 1] >= x0[:, None])
+    left = np.maximum(cols[None, :, 0], x0[:, None])
+    right = np.minimum(cols[None, :, 1], x1[:, None])
+    lt_col_overlap = np.where(
+        overlap, np.abs(left - right) / np.abs(cols[None, :, 0] - cols[None, :, 1]), -1
+    )
+    c_idx = np.where(found, np.argmax(lt_col_overlap, axis=1), -1)
+    for i in np.nonzero(found & ~overlap.any(axis=1))[0]:
+        t = texts[i]
+        text = t.get_text().strip("\n")
+        text_range = (t.x0, t.x1)
+        col_range = (table.cols[0][0], table.cols[-1][1])
+        warnings.warn(
+            "{} {} does not lie in column range {}".format(
+                text, text_range, col_range
+            )
+        )
+
+    # error calculation
+    row, col = rows[r_idx], cols[c_idx]
+    y0_offset = np.where(y0 > row[:, 0], np.abs(y0 - row[:, 0]), 0)
+    y1_offset = np.where(y1 < row[:, 1], np.abs(y1 - row[:, 1]), 0)
+    x0_offset = np.where(x0 < col[:, 0], np.abs(x0 - col[:, 0]), 0)
+    x1_offset = np.where(x1 > col[:, 1], np.abs(x1 - col[:, 1]), 0)
+    X = np.abs(x0 - x1)
+    X[X == 0.0] = 1.0
+    Y = np.abs(y0 - y1)
+    Y[Y == 0.0] = 1.0
+    error = ((X * (y0_offset + y1_offset)) + (Y * (x0_offset + x1_offset))) / (X * Y)
+    return r_idx, c_idx, error
+
+
 def reduce_index(t, idx, shift_text):
     indices = []
     for r_idx, c_idx, text in idx:
@@ -114,4 +184,44 @@ def reduce_index(t, idx, shift_text):
                         r_idx += 1
                         
         indices.append((r_idx, c_idx, text))
-    return indices
\ No newline at end of file
+    return indices
+
+
+def _span_targets(span, edge, step):
+    """For every cell, the index along axis 0 reached by moving `step`
+    (+1 or -1) until a cell with `edge`, or the cell itself when it does
+    not span. Mirrors the while loops of `reduce_index`.
+    """
+    n = edge.shape[0]
+    index = np.arange(n)[:, None].repeat(edge.shape[1], axis=1)
+    if step > 0:
+        # first edge at or after each index
+        candidates = np.where(edge, index, n)
+        reach = np.minimum.accumulate(candidates[::-1], axis=0)[::-1]
+    else:
+        # last edge at or before each index
+        candidates = np.where(edge, index, -1)
+        reach = np.maximum.accumulate(candidates, axis=0)
+    return np.where(span, reach, index)
+
+
+def reduce_indices(t, r_idx, c_idx, shift_text):
+    """Batch version of `reduce_index` for the arrays returned by
+    `get_table_indices`, shifting every text at once with lookup tables
+    built from the cell edges instead of walking spans text by text.
+
+    Negative indices are wrapped like Python list indices, so the
+    returned indices point at the same cells.
+    """
+    r_idx = np.asarray(r_idx) % len(t.rows)
+    c_idx = np.asarray(c_idx) % len(t.cols)
+    for d in shift_text:
+        if d == "l":
+            c_idx = _span_targets(t.hspan.T, t.left.T, -1)[c_idx, r_idx]
+        if d == "r":
+            c_idx = _span_targets(t.hspan.T, t.right.T, 1)[c_idx, r_idx]
+        if d == "t":
+            r_idx = _span_targets(t.vspan, t.top, -1)[r_idx, c_idx]
+        if d == "b":
+            r_idx = _span_targets(t.vspan, t.bottom, 1)[r_idx, c_idx]
+    return r_idx, c_idx
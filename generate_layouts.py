@@ -1,18 +1,6 @@
-from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
-from pdfminer.converter import PDFPageAggregator
-from pdfminer.layout import LAParams
-from pdfminer.pdfpage import PDFPage, PDFTextExtractionNotAllowed
-from pdfminer.pdfparser import PDFParser
-from pdfminer.pdfdocument import PDFDocument
 import collections
-
-from pdfminer.layout import (
-    LAParams,
-    LTChar,
-    LTTextLineHorizontal,
-    LTTextLineVertical,
-    LTImage
-)
+import collections.abc
+# pdfminer is imported at first use, by the functions that parse or walk a PDF
 
 def get_pdf_layouts(file_name, char_margin: float = 1.0, line_margin: float = 1.5, 
                 word_margin: float = 0.1, detect_vertical: bool = True, all_texts: bool = True):
@@ -25,6 +13,12 @@ def get_pdf_layouts(file_name, char_margin: float = 1.0, line_margin: float = 1.
     ?Param detect_vertical: Detect vertical text
     ?Param all_texts: Extract all texts
     """
+    from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
+    from pdfminer.converter import PDFPageAggregator
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfpage import PDFPage, PDFTextExtractionNotAllowed
+    from pdfminer.pdfparser import PDFParser
+    from pdfminer.pdfdocument import PDFDocument
     with open(file_name, "rb") as file:
         parser = PDFParser(file)
         document = PDFDocument(parser)
@@ -51,28 +45,195 @@ def get_pdf_layouts(file_name, char_margin: float = 1.0, line_margin: float = 1.
             page_number += 1
         return layouts
 
+class LazyPDFLayouts(collections.abc.Mapping):
+    """
+    TODO: Extract the layout of a PDF file page by page, on first access
+    ?Param file_name: Path to the PDF file
+    ?Param char_margin: Margin between characters
+    ?Param line_margin: Margin between lines
+    ?Param word_margin: Margin between words
+    ?Param detect_vertical: Detect vertical text
+    ?Param all_texts: Extract all texts
+
+    Keys and values are the same as the ones of `get_pdf_layouts`
+    (`page_N` -> {"layout": ..., "dim": ...}), but a page is only
+    analysed when it is looked up, so the cost scales with the number
+    of requested pages instead of the length of the document.
+    """
+    def __init__(self, file_name, char_margin: float = 1.0, line_margin: float = 1.5,
+                word_margin: float = 0.1, detect_vertical: bool = True, all_texts: bool = True):
+        from pdfminer.layout import LAParams
+        self.file_name = file_name
+        self.laparams = LAParams(
+            char_margin = char_margin,
+            line_margin = line_margin,
+            word_margin = word_margin,
+            detect_vertical = detect_vertical,
+            all_texts = all_texts
+        )
+        self._file = None
+        self._pages = None
+        self._interpreter = None
+        self._device = None
+        self._layouts = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _open(self):
+        """
+        TODO: Open the PDF file and list its pages, without analysing them
+        """
+        if self._pages is not None:
+            return
+        from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
+        from pdfminer.converter import PDFPageAggregator
+        from pdfminer.pdfpage import PDFPage, PDFTextExtractionNotAllowed
+        from pdfminer.pdfparser import PDFParser
+        from pdfminer.pdfdocument import PDFDocument
+        self._file = open(self.file_name, "rb")
+        parser = PDFParser(self._file)
+        document = PDFDocument(parser)
+        if not document.is_extractable:
+            self.close()
+            raise PDFTextExtractionNotAllowed
+        rsrcmgr = PDFResourceManager() # Create a PDF resource manager object that stores shared resources
+        self._device = PDFPageAggregator(rsrcmgr, laparams = self.laparams) # Create a PDF device object
+        self._interpreter = PDFPageInterpreter(rsrcmgr, self._device) # Create a PDF interpreter object
+        self._pages = list(PDFPage.create_pages(document))
+
+    def _page_number(self, key):
+        try:
+            prefix, page_number = key.split("_")
+            page_number = int(page_number)
+        except (AttributeError, ValueError):
+            raise KeyError(key)
+        if prefix != "page" or not 1 <= page_number <= len(self):
+            raise KeyError(key)
+        return page_number
+
+    def __getitem__(self, key):
+        page_number = self._page_number(key)
+        if key not in self._layouts:
+            self._interpreter.process_page(self._pages[page_number - 1])
+            layout = self._device.get_result()
+            self._layouts[key] = {
+                "layout": layout,
+                "dim": (layout.bbox[2], layout.bbox[3])
+            }
+        return self._layouts[key]
+
+    def __iter__(self):
+        return (f"page_{page_number}" for page_number in range(1, len(self) + 1))
+
+    def __len__(self):
+        self._open()
+        return len(self._pages)
+
+    def release(self, key):
+        """
+        TODO: Drop the cached layout of a page so its LTPage tree can be freed
+        ?Param key: Page key of the form `page_N`
+        """
+        self._layouts.pop(key, None)
+
+    def close(self):
+        """
+        TODO: Close the PDF file and drop every cached layout
+        """
+        if self._file is not None:
+            self._file.close()
+        self._file = None
+        self._pages = None
+        self._interpreter = None
+        self._device = None
+        self._layouts = {}
+
+# ltype -> name of its class in pdfminer.layout
+LAYOUT_OBJECT_TYPES = {
+    "char": "LTChar",
+    "image": "LTImage",
+    "horizontal_text": "LTTextLineHorizontal",
+    "vertical_text": "LTTextLineVertical",
+    "curve": "LTCurve", # also covers LTLine and LTRect
+}
+
+def get_layout_objects(layout):
+    """
+    TODO: Walk a PDF layout once and sort its objects into typed buckets
+    ?Param layout: PDFMiner layout object
+    !Returns: Dict mapping every ltype of `LAYOUT_OBJECT_TYPES` to the list
+        of its objects, in document order. The dict is cached on the layout,
+        so later calls for the same page do not walk the tree again
+    """
+    objects = getattr(layout, "_layout_objects", None)
+    if objects is not None:
+        return objects
+    import pdfminer.layout
+    LTContainer = pdfminer.layout.LTContainer
+    objects = {ltype: [] for ltype in LAYOUT_OBJECT_TYPES}
+    if not isinstance(layout, LTContainer):
+        return objects
+    buckets = [
+        (getattr(pdfminer.layout, class_name), objects[ltype])
+        for ltype, class_name in LAYOUT_OBJECT_TYPES.items()
+    ]
+    # stack of child iterators keeps the same pre-order as a recursive walk
+    stack = [iter(layout)]
+    while stack:
+        for obj in stack[-1]:
+            for LTObject, bucket in buckets:
+                if isinstance(obj, LTObject):
+                    bucket.append(obj)
+            if isinstance(obj, LTContainer):
+                stack.append(iter(obj))
+                break
+        else:
+            stack.pop()
+    layout._layout_objects = objects
+    return objects
+
 def get_text_objects(layout, ltype="char", t=None):
     """
-    TODO: Recursively parses pdf layout to get a list of PDFMiner text objects.
+    TODO: Get a list of PDFMiner text objects of a layout
     ?Param layout: PDFMiner layout object
     ?Param ltype: Type of text object to extract
     """
-    if ltype == "char":
-        LTObject = LTChar
-    elif ltype == "image":
-        LTObject = LTImage
-    elif ltype == "horizontal_text":
-        LTObject = LTTextLineHorizontal
-    elif ltype == "vertical_text":
-        LTObject = LTTextLineVertical
+    if ltype not in LAYOUT_OBJECT_TYPES:
+        raise ValueError(f"Unknown layout object type: {ltype}")
     if t is None:
         t = []
-    try:
-        for obj in layout._objs:
-            if isinstance(obj, LTObject):
-                t.append(obj)
-            else:
-                t += get_text_objects(obj, ltype=ltype)
-    except AttributeError as e:
-        pass
-    return t
\ No newline at end of file
+    t.extend(get_layout_objects(layout)[ltype])
+    return t
+
+def get_ruling_segments(layout, max_line_width: float = 2.0):
+    """
+    TODO: Get the horizontal and vertical ruling segments drawn on a page
+    ?Param layout: PDFMiner layout object
+    ?Param max_line_width: Thickness under which a rectangle or curve is a single line
+    !Returns: Vertical segments (x, y0, x, y1) and horizontal segments
+        (x0, y, x1, y) in PDF coordinate space, the same form as the
+        scaled output of `find_lines`
+    """
+    from pdfminer.layout import LTRect
+    v_segments, h_segments = [], []
+    for curve in get_layout_objects(layout)["curve"]:
+        x0, y0, x1, y1 = curve.bbox
+        if curve.height <= max_line_width and curve.width > max_line_width:
+            h_segments.append((x0, (y0 + y1) / 2, x1, (y0 + y1) / 2))
+        elif curve.width <= max_line_width and curve.height > max_line_width:
+            v_segments.append(((x0 + x1) / 2, y0, (x0 + x1) / 2, y1))
+        elif curve.stroke:
+            # rectangles and polylines contribute each of their axis-aligned sides
+            pts = list(curve.pts)
+            if isinstance(curve, LTRect):
+                pts.append(pts[0])
+            for (xa, ya), (xb, yb) in zip(pts, pts[1:]):
+                if abs(ya - yb) <= max_line_width and abs(xa - xb) > max_line_width:
+                    h_segments.append((min(xa, xb), (ya + yb) / 2, max(xa, xb), (ya + yb) / 2))
+                elif abs(xa - xb) <= max_line_width and abs(ya - yb) > max_line_width:
+                    v_segments.append(((xa + xb) / 2, min(ya, yb), (xa + xb) / 2, max(ya, yb)))
+    return v_segments, h_segments
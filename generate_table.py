@@ -1,47 +1,149 @@
 import numpy as np
+from collections import defaultdict
+from collections.abc import Sequence
+
+
+def _edge_property(name):
+    def fget(self):
+        return bool(getattr(self._table, name)[self._r, self._c])
+
+    def fset(self, value):
+        getattr(self._table, name)[self._r, self._c] = value
+
+    return property(fget, fset)
+
+
+def _close_matches(values, xs, atol):
+    """For each x in `xs`, the ascending indices i of `values` for which
+    `np.isclose(x, values[i], atol=atol)`, found with `searchsorted` on
+    the sorted values instead of comparing against all of them.
+    """
+    rtol = 1e-05  # np.isclose default
+    values = np.asarray(values, dtype=float)
+    order = np.argsort(values, kind="stable")
+    sorted_values = values[order]
+    slack = atol + rtol * (np.abs(values).max() if len(values) else 0.0)
+    lo = np.searchsorted(sorted_values, xs - slack, side="left").tolist()
+    hi = np.searchsorted(sorted_values, xs + slack, side="right").tolist()
+    order, values = order.tolist(), values.tolist()
+    matches = []
+    for x, start, end in zip(np.asarray(xs, dtype=float).tolist(), lo, hi):
+        matches.append(sorted(
+            i for i in order[start:end]
+            if abs(x - values[i]) <= atol + rtol * abs(values[i])
+        ))
+    return matches
+
 
 class Cell(object):
-    def __init__(self, x1, y1, x2, y2):
-        self.x1 = x1
-        self.y1 = y1
-        self.x2 = x2
-        self.y2 = y2
-        self.lb = (x1, y1)
-        self.lt = (x1, y2)
-        self.rb = (x2, y1)
-        self.rt = (x2, y2)
-        self.left = False
-        self.right = False
-        self.top = False
-        self.bottom = False
-        self.hspan = False
-        self.vspan = False
-        self._text = ""
+    """Lightweight view on one cell of a Table, whose edges, spans and
+    text are stored in the table's arrays.
+    """
+
+    __slots__ = ("_table", "_r", "_c")
+
+    def __init__(self, table, r, c):
+        self._table = table
+        self._r = r
+        self._c = c
 
     def __repr__(self):
         return "<Cell x1={} y1={} x2={} y2={}>".format(
             round(self.x1, 2), round(self.y1, 2), round(self.x2, 2), round(self.y2, 2)
         )
 
+    def __eq__(self, other):
+        return (
+            isinstance(other, Cell)
+            and self._table is other._table
+            and (self._r, self._c) == (other._r, other._c)
+        )
+
+    def __hash__(self):
+        return hash((id(self._table), self._r, self._c))
+
+    x1 = property(lambda self: self._table.cols[self._c][0])
+    y1 = property(lambda self: self._table.rows[self._r][1])
+    x2 = property(lambda self: self._table.cols[self._c][1])
+    y2 = property(lambda self: self._table.rows[self._r][0])
+    lb = property(lambda self: (self.x1, self.y1))
+    lt = property(lambda self: (self.x1, self.y2))
+    rb = property(lambda self: (self.x2, self.y1))
+    rt = property(lambda self: (self.x2, self.y2))
+
+    left = _edge_property("left")
+    right = _edge_property("right")
+    top = _edge_property("top")
+    bottom = _edge_property("bottom")
+    hspan = _edge_property("hspan")
+    vspan = _edge_property("vspan")
+
     @property
     def text(self):
-        return self._text
+        return "".join(self._table._text_parts.get((self._r, self._c), ()))
 
     @text.setter
     def text(self, t):
-        self._text = "".join([self._text, t])
+        self._table._text_parts[(self._r, self._c)].append(t)
 
     @property
     def bound(self):
         """The number of sides on which the cell is bounded.
         """
         return self.top + self.bottom + self.left + self.right
-    
+
+
+class _CellRow(Sequence):
+    """Row of Cell views, created on access."""
+
+    def __init__(self, table, r):
+        self._table = table
+        self._r = r
+
+    def __len__(self):
+        return len(self._table.cols)
+
+    def __getitem__(self, c):
+        if not -len(self) <= c < len(self):
+            raise IndexError("cell index out of range")
+        return Cell(self._table, self._r, c % len(self))
+
+
+class _CellRows(Sequence):
+    """Grid of Cell views, `table.cells[r][c]`, created on access."""
+
+    def __init__(self, table):
+        self._table = table
+
+    def __len__(self):
+        return len(self._table.rows)
+
+    def __getitem__(self, r):
+        if not -len(self) <= r < len(self):
+            raise IndexError("row index out of range")
+        return _CellRow(self._table, r % len(self))
+
+
 class Table(object):
+    """Table stored as arrays: one boolean array of shape
+    (rows, cols) per edge and span, coordinate arrays for the rows and
+    columns, and the text parts of each cell joined once in `data`.
+    """
+
     def __init__(self, cols, rows):
         self.cols = cols
         self.rows = rows
-        self.cells = [[Cell(c[0], r[1], c[1], r[0]) for c in cols] for r in rows]
+        self.col_coords = np.array(cols, dtype=float).reshape(-1, 2)
+        self.row_coords = np.array(rows, dtype=float).reshape(-1, 2)
+        grid = (len(rows), len(cols))
+        self.left = np.zeros(grid, dtype=bool)
+        self.right = np.zeros(grid, dtype=bool)
+        self.top = np.zeros(grid, dtype=bool)
+        self.bottom = np.zeros(grid, dtype=bool)
+        self.hspan = np.zeros(grid, dtype=bool)
+        self.vspan = np.zeros(grid, dtype=bool)
+        self._text_parts = defaultdict(list)
+        self.cells = _CellRows(self)
         self.df = None
         self.shape = (0, 0)
         self.accuracy = 0
@@ -63,9 +165,9 @@ class Table(object):
     def data(self):
         """Returns two-dimensional list of strings in table.
         """
-        d = []
-        for row in self.cells:
-            d.append([cell.text.strip() for cell in row])
+        d = [["" for c in self.cols] for r in self.rows]
+        for (r, c), parts in self._text_parts.items():
+            d[r][c] = "".join(parts).strip()
         return d
 
     @property
@@ -85,9 +187,8 @@ class Table(object):
     def set_all_edges(self):
         """Sets all table edges to True.
         """
-        for row in self.cells:
-            for cell in row:
-                cell.left = cell.right = cell.top = cell.bottom = True
+        for edge in (self.left, self.right, self.top, self.bottom):
+            edge[:] = True
         return self
 
     def set_edges(self, vertical, horizontal, joint_tol=2):
@@ -95,6 +196,10 @@ class Table(object):
         coordinates overlap with the line's coordinates within a
         tolerance.
 
+        Line ends are matched to the row and column boundaries with
+        `_close_matches` and each run of edges is set with one slice
+        assignment.
+
         Parameters
         ----------
         vertical : list
@@ -103,168 +208,73 @@ class Table(object):
             List of detected horizontal lines.
 
         """
-        for v in vertical:
-            # find closest x coord
-            # iterate over y coords and find closest start and end points
-            i = [
-                i
-                for i, t in enumerate(self.cols)
-                if np.isclose(v[0], t[0], atol=joint_tol)
-            ]
-            j = [
-                j
-                for j, t in enumerate(self.rows)
-                if np.isclose(v[3], t[0], atol=joint_tol)
-            ]
-            k = [
-                k
-                for k, t in enumerate(self.rows)
-                if np.isclose(v[1], t[0], atol=joint_tol)
-            ]
-            if not j:
-                continue
-            J = j[0]
-            if i == [0]:  # only left edge
-                L = i[0]
-                if k:
-                    K = k[0]
-                    while J < K:
-                        self.cells[J][L].left = True
-                        J += 1
-                else:
-                    K = len(self.rows)
-                    while J < K:
-                        self.cells[J][L].left = True
-                        J += 1
-            elif i == []:  # only right edge
-                L = len(self.cols) - 1
-                if k:
-                    K = k[0]
-                    while J < K:
-                        self.cells[J][L].right = True
-                        J += 1
-                else:
-                    K = len(self.rows)
-                    while J < K:
-                        self.cells[J][L].right = True
-                        J += 1
-            else:  # both left and right edges
-                L = i[0]
-                if k:
-                    K = k[0]
-                    while J < K:
-                        self.cells[J][L].left = True
-                        self.cells[J][L - 1].right = True
-                        J += 1
-                else:
-                    K = len(self.rows)
-                    while J < K:
-                        self.cells[J][L].left = True
-                        self.cells[J][L - 1].right = True
-                        J += 1
-
-        for h in horizontal:
-            # find closest y coord
-            # iterate over x coords and find closest start and end points
-            i = [
-                i
-                for i, t in enumerate(self.rows)
-                if np.isclose(h[1], t[0], atol=joint_tol)
-            ]
-            j = [
-                j
-                for j, t in enumerate(self.cols)
-                if np.isclose(h[0], t[0], atol=joint_tol)
-            ]
-            k = [
-                k
-                for k, t in enumerate(self.cols)
-                if np.isclose(h[2], t[0], atol=joint_tol)
-            ]
-            if not j:
-                continue
-            J = j[0]
-            if i == [0]:  # only top edge
-                L = i[0]
-                if k:
-                    K = k[0]
-                    while J < K:
-                        self.cells[L][J].top = True
-                        J += 1
-                else:
-                    K = len(self.cols)
-                    while J < K:
-                        self.cells[L][J].top = True
-                        J += 1
-            elif i == []:  # only bottom edge
-                L = len(self.rows) - 1
-                if k:
-                    K = k[0]
-                    while J < K:
-                        self.cells[L][J].bottom = True
-                        J += 1
-                else:
-                    K = len(self.cols)
-                    while J < K:
-                        self.cells[L][J].bottom = True
-                        J += 1
-            else:  # both top and bottom edges
-                L = i[0]
-                if k:
-                    K = k[0]
-                    while J < K:
-                        self.cells[L][J].top = True
-                        self.cells[L - 1][J].bottom = True
-                        J += 1
-                else:
-                    K = len(self.cols)
-                    while J < K:
-                        self.cells[L][J].top = True
-                        self.cells[L - 1][J].bottom = True
-                        J += 1
+        col_starts = self.col_coords[:, 0]
+        row_tops = self.row_coords[:, 0]
+
+        if len(vertical):
+            v = np.array(vertical, dtype=float).reshape(-1, 4)
+            # closest x coord, then closest start and end points in y
+            i_matches = _close_matches(col_starts, v[:, 0], joint_tol)
+            j_matches = _close_matches(row_tops, v[:, 3], joint_tol)
+            k_matches = _close_matches(row_tops, v[:, 1], joint_tol)
+            for i, j, k in zip(i_matches, j_matches, k_matches):
+                if not j:
+                    continue
+                J = j[0]
+                K = k[0] if k else len(self.rows)
+                if i == [0]:  # only left edge
+                    self.left[J:K, 0] = True
+                elif i == []:  # only right edge
+                    self.right[J:K, len(self.cols) - 1] = True
+                else:  # both left and right edges
+                    L = i[0]
+                    self.left[J:K, L] = True
+                    self.right[J:K, L - 1] = True
+
+        if len(horizontal):
+            h = np.array(horizontal, dtype=float).reshape(-1, 4)
+            # closest y coord, then closest start and end points in x
+            i_matches = _close_matches(row_tops, h[:, 1], joint_tol)
+            j_matches = _close_matches(col_starts, h[:, 0], joint_tol)
+            k_matches = _close_matches(col_starts, h[:, 2], joint_tol)
+            for i, j, k in zip(i_matches, j_matches, k_matches):
+                if not j:
+                    continue
+                J = j[0]
+                K = k[0] if k else len(self.cols)
+                if i == [0]:  # only top edge
+                    self.top[0, J:K] = True
+                elif i == []:  # only bottom edge
+                    self.bottom[len(self.rows) - 1, J:K] = True
+                else:  # both top and bottom edges
+                    L = i[0]
+                    self.top[L, J:K] = True
+                    self.bottom[L - 1, J:K] = True
 
         return self
 
     def set_border(self):
         """Sets table border edges to True.
         """
-        for r in range(len(self.rows)):
-            self.cells[r][0].left = True
-            self.cells[r][len(self.cols) - 1].right = True
-        for c in range(len(self.cols)):
-            self.cells[0][c].top = True
-            self.cells[len(self.rows) - 1][c].bottom = True
+        self.left[:, 0] = True
+        self.right[:, -1] = True
+        self.top[0, :] = True
+        self.bottom[-1, :] = True
         return self
 
     def set_span(self):
         """Sets a cell's hspan or vspan attribute to True depending
         on whether the cell spans horizontally or vertically.
         """
-        for row in self.cells:
-            for cell in row:
-                left = cell.left
-                right = cell.right
-                top = cell.top
-                bottom = cell.bottom
-                if cell.bound == 4:
-                    continue
-                elif cell.bound == 3:
-                    if not left and (right and top and bottom):
-                        cell.hspan = True
-                    elif not right and (left and top and bottom):
-                        cell.hspan = True
-                    elif not top and (left and right and bottom):
-                        cell.vspan = True
-                    elif not bottom and (left and right and top):
-                        cell.vspan = True
-                elif cell.bound == 2:
-                    if left and right and (not top and not bottom):
-                        cell.vspan = True
-                    elif top and bottom and (not left and not right):
-                        cell.hspan = True
-                elif cell.bound in [0, 1]:
-                    cell.vspan = True
-                    cell.hspan = True
+        left, right, top, bottom = self.left, self.right, self.top, self.bottom
+        bound = left.astype(np.int8) + right + top + bottom
+        # three sides: spans towards the open side
+        self.hspan |= (bound == 3) & ~(left & right)
+        self.vspan |= (bound == 3) & ~(top & bottom)
+        # two opposite sides: spans along them
+        self.vspan |= (bound == 2) & left & right
+        self.hspan |= (bound == 2) & top & bottom
+        # zero or one side: spans both ways
+        self.hspan |= bound <= 1
+        self.vspan |= bound <= 1
         return self
-
-    
\ No newline at end of file
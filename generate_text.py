@@ -1,4 +1,3 @@
-from pdfminer.layout import LTChar, LTAnno
 from operator import itemgetter
 from itertools import groupby
 import numpy as np
@@ -48,6 +47,80 @@ def text_in_bbox(bbox, text):
     return t_bbox
 
 
+class TextIndex(object):
+    """Spatial index of the text objects of a page, built once and
+    queried for every table with `in_bbox`.
+
+    Text centres are kept sorted by x, so a query only looks at the
+    text whose centre lies in the x range of the bounding box.
+
+    Parameters
+    ----------
+    text : List of PDFMiner text objects.
+
+    """
+
+    def __init__(self, text):
+        self.text = list(text)
+        cx = np.array([(t.x0 + t.x1) / 2.0 for t in self.text], dtype=float)
+        cy = np.array([(t.y0 + t.y1) / 2.0 for t in self.text], dtype=float)
+        self._order = np.argsort(cx, kind="stable")
+        self._cx = cx[self._order]
+        self._cy = cy[self._order]
+
+    def in_bbox(self, bbox):
+        """Returns the same text objects as `text_in_bbox`, in the same order."""
+        lo = np.searchsorted(self._cx, bbox[0] - 2, side="left")
+        hi = np.searchsorted(self._cx, bbox[2] + 2, side="right")
+        cy = self._cy[lo:hi]
+        inside = (bbox[1] - 2 <= cy) & (cy <= bbox[3] + 2)
+        return [self.text[i] for i in np.sort(self._order[lo:hi][inside])]
+
+
+class SegmentIndex(object):
+    """Spatial index of the vertical and horizontal segments of a page,
+    built once and queried for every table with `in_bbox`.
+
+    Vertical segments are kept sorted by x and horizontal ones by y, the
+    coordinate `segments_in_bbox` bounds with both ends inclusive.
+
+    Parameters
+    ----------
+    v_segments : list
+        Vertical segments (x, y0, x, y1).
+    h_segments : list
+        Horizontal segments (x0, y, x1, y).
+
+    """
+
+    def __init__(self, v_segments, h_segments):
+        self.v_segments = list(v_segments)
+        self.h_segments = list(h_segments)
+        self._v = self._sorted(self.v_segments, axis=0)
+        self._h = self._sorted(self.h_segments, axis=1)
+
+    @staticmethod
+    def _sorted(segments, axis):
+        coords = np.array(segments, dtype=float).reshape(-1, 4)
+        order = np.argsort(coords[:, axis], kind="stable")
+        return order, coords[order]
+
+    @staticmethod
+    def _query(sorted_segments, axis, lo, hi, other, other_lo, other_hi):
+        order, coords = sorted_segments
+        start = np.searchsorted(coords[:, axis], lo, side="left")
+        end = np.searchsorted(coords[:, axis], hi, side="right")
+        coords = coords[start:end]
+        inside = (coords[:, other] > other_lo) & (coords[:, other + 2] < other_hi)
+        return np.sort(order[start:end][inside])
+
+    def in_bbox(self, bbox):
+        """Returns the same segments as `segments_in_bbox`, in the same order."""
+        v_idx = self._query(self._v, 0, bbox[0] - 2, bbox[2] + 2, 1, bbox[1] - 2, bbox[3] + 2)
+        h_idx = self._query(self._h, 1, bbox[1] - 2, bbox[3] + 2, 0, bbox[0] - 2, bbox[2] + 2)
+        return [self.v_segments[i] for i in v_idx], [self.h_segments[i] for i in h_idx]
+
+
 def text_strip(text, strip=""):
     """Strips any characters in `strip` that are present in `text`.
     Parameters
@@ -87,6 +160,7 @@ def flag_font_size(textline, direction, strip_text=""):
     fstring : string
 
     """
+    from pdfminer.layout import LTAnno
     if direction == "horizontal":
         d = [
             (t.get_text(), np.round(t.height, decimals=6))
@@ -146,6 +220,7 @@ def split_textline(table, textline, direction, flag_size=False, strip_text=""):
         of row/column and text is the an lttextline substring.
 
     """
+    from pdfminer.layout import LTChar, LTAnno
     idx = 0
     cut_text = []
     bbox = textline.bbox
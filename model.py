@@ -1,28 +1,97 @@
-from generate_file import download_pdf, delete_all_files_in_folder
-from generate_layouts import get_pdf_layouts, get_text_objects
-from generate_images import convert_pdf_to_img, adaptive_threshold, scale_image
-from generate_text import segments_in_bbox, text_in_bbox
+# the stage modules import cv2, pdfminer, pdf2image and httpx at first use,
+# see IMPORT_BUDGETS in benchmark.py for the cold-start budget
+import os
+from generate_file import get_downloader, delete_all_files_in_folder
+from generate_layouts import LazyPDFLayouts, get_layout_objects, get_ruling_segments
+from generate_images import convert_pdf_to_img, convert_pdf_to_array, adaptive_threshold, scale_image, get_page_batches
+from generate_text import TextIndex, SegmentIndex
 from generate_table import Table
-from generate_index_table import get_table_index, reduce_index
-from utils import find_lines, find_contours, find_joints, merge_close_lines
-from itertools import zip_longest
+from generate_index_table import get_table_indices, reduce_indices
+from utils import find_lines, find_contours, find_joints, find_vector_tables, merge_close_lines_batch, has_plausible_grid, \
+    compute_accuracy, compute_whitespace
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+import tracemalloc
+import numpy as np
+from cache import file_sha256
+from stats import ExtractionStats
+
+# settings for LLPRAMS
+LAYOUT_KWARGS = {
+    'char_margin': 1.0,
+    'line_margin': 0.5,
+    'word_margin': 0.1,
+    'detect_vertical': True,
+    'all_texts': True
+}
+# lower resolutions tried first by adaptive_dpi, below the requested `dpi`
+ADAPTIVE_DPI_STEPS = (100, 200)
+
+
+def page_data(tables):
+    """
+    TODO: Join the rows of the tables of a page, the layout of table_pdf_dict
+    ?param tables: Tables of a page, as returned by `PDF_TABLE._generate_table`
+    """
+    return [row for table in tables for row in table["cells"]]
 
 
 class PDF_TABLE:
-    def __init__(self, url, folder, page_pdf_list):
+    def __init__(self, url, folder, page_pdf_list, in_memory = False, workers = 1, pdf_cache = None,
+                 result_cache = None, dpi = 300, adaptive_dpi = False, mode = "image",
+                 track_memory = False, prometheus = False):
         self.url = url
         self.folder = folder
         self.page_pdf_list = page_pdf_list
+        self.in_memory = in_memory # render pages to numpy arrays instead of PNG files
+        self.workers = workers # number of processes extracting pages in parallel
+        self.layout_kwargs = dict(LAYOUT_KWARGS)
+        self.dpi = dpi # resolution of the rendered pages
+        self.mode = mode # "vector" reads ruling lines from the layout and only renders pages without them
+        self.adaptive_dpi = adaptive_dpi # render at ADAPTIVE_DPI_STEPS first, at `dpi` only when no grid is found
+        self.line_scale = 15 # line size scaling factor of find_lines
+        self.joint_tol = 2 # tolerance of Table.set_edges
+        self.line_tol = 2 # tolerance of merge_close_lines
+        self.render_batch_size = 4 # pages rendered at once, their tables are yielded before the next ones are rendered
+        self.pdf_cache = pdf_cache # cache.PDFCache reusing PDFs downloaded by earlier runs
+        self.result_cache = result_cache # cache.ResultCache reusing tables extracted by earlier runs
+        self.track_memory = track_memory # record the peak memory of each page in memory_pdf_dict
+        self.prometheus = prometheus # also record the stats in the prometheus_client metrics
+        self.stats = ExtractionStats() # time, memory and counts of every stage of the last run
         self.table_pdf_dict = {}
+        self.memory_pdf_dict = {}
+    
+    def __getstate__(self):
+        # workers only extract pages, downloads and cached results stay in the parent
+        state = self.__dict__.copy()
+        state["pdf_cache"] = None
+        state["result_cache"] = None
+        return state
+    
+    @property
+    def extraction_params(self):
+        """
+        TODO: Parameters that change the extracted tables, used to key cached results
+        """
+        return {
+            "layout_kwargs": self.layout_kwargs,
+            "mode": self.mode,
+            "dpi": self.dpi,
+            "adaptive_dpi": self.adaptive_dpi,
+            "line_scale": self.line_scale,
+            "joint_tol": self.joint_tol,
+            "line_tol": self.line_tol,
+        }
     
     
     def _generate_images(self, path_img, dim):
         """
         TODO: Generate images for table extraction
-        ?param path_img: Path to the image
+        ?param path_img: Path to the image, or the image as a numpy array
         ?param dim: Dimensions of the PDF
         """
-        img, threshold = adaptive_threshold(image_file = path_img)
+        with self.stats.stage("threshold"):
+            img, threshold = adaptive_threshold(image_file = path_img)
         pdf_width, pdf_height = dim
         image_width, image_height = img.shape[1], img.shape[0]
         
@@ -35,151 +104,470 @@ class PDF_TABLE:
         pdf_scalers = (pdf_width_scaler, pdf_height_scaler, image_height)
         return threshold, image_scalers, pdf_scalers
     
-    def _generate_rows_and_columns(self, tk, table_bbox):
-        cols, rows = zip(*table_bbox[tk])
-        cols, rows = list(cols), list(rows)
-        cols.extend([tk[0], tk[2]])
-        rows.extend([tk[1], tk[3]])
+    def _generate_rows_and_columns(self, table_keys, table_bbox):
+        """
+        TODO: Generate the rows and columns of every table on the page
+        ?param table_keys: Table boundaries
+        ?param table_bbox: Table boundaries with their joints
+        """
+        cols_list, rows_list = [], []
+        for tk in table_keys:
+            cols, rows = zip(*table_bbox[tk])
+            cols, rows = list(cols), list(rows)
+            cols.extend([tk[0], tk[2]])
+            rows.extend([tk[1], tk[3]])
+            cols_list.append(sorted(cols))
+            rows_list.append(sorted(rows, reverse=True))
         
-        cols = merge_close_lines(sorted(cols), line_tol=2)
-        rows = merge_close_lines(sorted(rows, reverse=True), line_tol=2)
-        cols = [(cols[index], cols[index + 1]) for index in range(0, len(cols) - 1)]
-        rows = [(rows[index], rows[index + 1]) for index in range(0, len(rows) - 1)]
-        return rows, cols
+        # one batched merge for the rows and columns of all tables
+        merged = merge_close_lines_batch(cols_list + rows_list, line_tol=self.line_tol)
+        rows_and_columns = []
+        for cols, rows in zip(merged[:len(table_keys)], merged[len(table_keys):]):
+            cols = [(cols[index], cols[index + 1]) for index in range(0, len(cols) - 1)]
+            rows = [(rows[index], rows[index + 1]) for index in range(0, len(rows) - 1)]
+            rows_and_columns.append((rows, cols))
+        return rows_and_columns
     
     def _generate_data(self, rows, cols, vertical_segments, horizontal_segments, t_bbox):
-        table = Table(cols, rows)
-        #? set  the segments in table
-        table = table.set_edges(vertical_segments, horizontal_segments, joint_tol=2)
-        #? set border of the table edges to True
-        table = table.set_border()
-        #? set spanning cells to True
-        table = table.set_span()
-        pos_errors = []
+        with self.stats.stage("table_edges"):
+            table = Table(cols, rows)
+            #? set  the segments in table
+            table = table.set_edges(vertical_segments, horizontal_segments, joint_tol=self.joint_tol)
+            #? set border of the table edges to True
+            table = table.set_border()
+            #? set spanning cells to True
+            table = table.set_span()
         direction = "horizontal"
-        for text in t_bbox[direction]:
-            indices, error = get_table_index(
+        texts = t_bbox[direction]
+        with self.stats.stage("text_assignment"):
+            #? assign every text line of the table to its cell in one batch
+            row_indices, column_indices, pos_errors = get_table_indices(
                 table = table,
-                t = text,
-                direction = direction,
+                texts = texts
             )
-            if indices[:2] != (-1, -1):
-                pos_errors.append(error)
-                indices = reduce_index(
-                    table, indices,
-                    ["b", "t"]
-                )
-                for row_index, column_index, text in indices:
-                    table.cells[row_index][column_index].text = text
-        return table.data
+            row_indices, column_indices = reduce_indices(
+                table, row_indices, column_indices,
+                ["b", "t"]
+            )
+            for row_index, column_index, text in zip(row_indices, column_indices, texts):
+                table.cells[row_index][column_index].text = text.get_text()
+            
+            data = table.data
+        table.shape = (len(rows), len(cols))
+        table.accuracy = compute_accuracy([[100, pos_errors]])
+        table.whitespace = compute_whitespace(data)
+        return table, data
+    
+    def _find_tables(self, threshold):
+        """
+        TODO: Find the ruling lines and table boundaries of a page image
+        ?param threshold: Thresholded page image
+        !Returns: Table boundaries with their joints, vertical lines and
+            horizontal lines, in image coordinate space
+        """
+        with self.stats.stage("find_lines"):
+            horizontal_dmask, horizontal_lines = find_lines(
+                threshold=threshold,
+                direction="horizontal",
+                line_scale=self.line_scale,
+                iterations=0
+            )
+            
+            vertical_dmask, vertical_lines = find_lines(
+                threshold=threshold,
+                direction="vertical",
+                line_scale=self.line_scale,
+                iterations=0
+            )
+        
+        with self.stats.stage("find_joints"):
+            contours = find_contours(vertical_dmask, horizontal_dmask)
+            
+            table_bbox = find_joints(
+                contours = contours,
+                vertical = vertical_dmask,
+                horizontal = horizontal_dmask
+            )
+        self.stats.count("joints", sum(len(joints) for joints in table_bbox.values()))
+        return table_bbox, vertical_lines, horizontal_lines
     
-    def _generate_table(self, horizontal_dmask, horizontal_lines, vertical_dmask, vertical_lines, horizontal_text, pdf_scalers):
+    def _generate_table(self, page_pdf, table_bbox, vertical_lines, horizontal_lines, horizontal_text, pdf_scalers):
         """
         TODO: Generate table from the images
-        ?param horizontal_dmask: Horizontal mask
-        ?param horizontal_lines: Horizontal lines
-        ?param vertical_dmask: Vertical mask
+        ?param page_pdf: Page number
+        ?param table_bbox: Table boundaries with their joints
         ?param vertical_lines: Vertical lines
+        ?param horizontal_lines: Horizontal lines
         ?param horizontal_text: Horizontal text
-        ?param pdf_scalers: PDF scalers
+        ?param pdf_scalers: PDF scalers, None when the tables and lines are
+            already in PDF coordinate space
+        !Returns: One dict per table, top to bottom, with its "page", its
+            "order" on the page (from 1), its "bbox" (x0, y0, x1, y1) in PDF
+            coordinate space, its "shape" (rows, columns), its "cells" and
+            its "parsing_report"
         """
-        contours = find_contours(vertical_dmask, horizontal_dmask)
-        
-        table_bbox = find_joints(
-            contours = contours,
-            vertical = vertical_dmask,
-            horizontal = horizontal_dmask
-        )
-        table_bbox, vertical_lines, horizontal_lines = scale_image(
-            tables = table_bbox,
-            v_segments=vertical_lines,
-            h_segments=horizontal_lines,
-            factors=pdf_scalers
-        )
-        data_list = []
-        t_bbox = {}
-        for table_index, tk in enumerate(
-            sorted(table_bbox.keys(), key = lambda x: x[1], reverse = True)
-        ):
-            vertical_segments, horizontal_segments = segments_in_bbox(
-                bbox = tk,
-                v_segments = vertical_lines,
-                h_segments = horizontal_lines
+        if pdf_scalers is not None:
+            table_bbox, vertical_lines, horizontal_lines = scale_image(
+                tables = table_bbox,
+                v_segments=vertical_lines,
+                h_segments=horizontal_lines,
+                factors=pdf_scalers
             )
-            t_bbox["horizontal"] = text_in_bbox(tk, horizontal_text)
+        self.stats.count("text_lines", len(horizontal_text))
+        self.stats.count("segments", len(vertical_lines) + len(horizontal_lines))
+        tables = []
+        t_bbox = {}
+        # indexed once per page, queried for every table
+        segment_index = SegmentIndex(vertical_lines, horizontal_lines)
+        text_index = TextIndex(horizontal_text)
+        table_keys = sorted(table_bbox.keys(), key = lambda x: x[1], reverse = True)
+        rows_and_columns = self._generate_rows_and_columns(
+            table_keys = table_keys,
+            table_bbox = table_bbox
+        )
+        for table_index, (tk, (rows, cols)) in enumerate(zip(table_keys, rows_and_columns)):
+            vertical_segments, horizontal_segments = segment_index.in_bbox(tk)
+            t_bbox["horizontal"] = text_index.in_bbox(tk)
             t_bbox["horizontal"].sort(key = lambda x: (-x.y0, x.x0))
             
-            rows, cols = self._generate_rows_and_columns(
-                tk = tk,
-                table_bbox = table_bbox
-            )
-            
-            data = self._generate_data(
+            table, data = self._generate_data(
                 rows = rows,
                 cols = cols,
                 vertical_segments = vertical_segments,
                 horizontal_segments = horizontal_segments,
                 t_bbox = t_bbox
             )
-            data_list.extend(data)
-        return data_list
+            table.page = page_pdf
+            table.order = table_index + 1
+            tables.append({
+                "page": page_pdf,
+                "order": table.order,
+                "bbox": [float(v) for v in tk],
+                "shape": list(table.shape),
+                "cells": data,
+                "parsing_report": table.parsing_report
+            })
+            self.stats.count("cells", len(rows) * len(cols))
+        self.stats.count("tables", len(tables))
+        return tables
     
-    def extract_table(self, layouts, page_pdf, path_img):
-        layout = layouts[f"page_{page_pdf}"]["layout"] # lấy layout của pdf
-        dim = layouts[f"page_{page_pdf}"]["dim"] # lấy kích thước của pdf
-        horizontal_text = get_text_objects(layout, ltype="horizontal_text") # lấy text theo chiều ngang
+    def extract_table(self, layouts, page_pdf, path_img, require_grid = False):
+        """
+        TODO: Extract the tables of a page
+        ?param layouts: Layouts of the PDF
+        ?param page_pdf: Page number
+        ?param path_img: Path to the page image, or the image as a numpy array
+        ?param require_grid: Return None instead of the tables when no
+            plausible grid is found, so the page can be rendered again at a
+            higher resolution
+        """
+        with self.stats.stage("layout"):
+            layout = layouts[f"page_{page_pdf}"]["layout"] # lấy layout của pdf
+            dim = layouts[f"page_{page_pdf}"]["dim"] # lấy kích thước của pdf
         
         threshold, image_scalers, pdf_scalers = self._generate_images(path_img, dim)
         
-        horizontal_dmask, horizontal_lines = find_lines(
-            threshold=threshold,
-            direction="horizontal",
-            line_scale=15,
-            iterations=0
-        )
-        
-        vertical_dmask, vertical_lines = find_lines(
-            threshold=threshold,
-            direction="vertical",
-            line_scale=15,
-            iterations=0
-        )
+        table_bbox, vertical_lines, horizontal_lines = self._find_tables(threshold)
+        if require_grid and not has_plausible_grid(table_bbox):
+            return None
         
-        data = self._generate_table(
-            horizontal_dmask = horizontal_dmask,
-            horizontal_lines = horizontal_lines,
-            vertical_dmask = vertical_dmask,
+        with self.stats.stage("layout"):
+            horizontal_text = get_layout_objects(layout)["horizontal_text"] # lấy text theo chiều ngang
+        tables = self._generate_table(
+            page_pdf = page_pdf,
+            table_bbox = table_bbox,
             vertical_lines = vertical_lines,
+            horizontal_lines = horizontal_lines,
             horizontal_text = horizontal_text,
             pdf_scalers = pdf_scalers
         )
-        return data
+        return tables
     
-    def run(self):
-        # Download PDF file
-        file_name = download_pdf(
-            url = self.url,
-            folder = self.folder
+    def extract_vector_table(self, layouts, page_pdf):
+        """
+        TODO: Extract the tables of a page from the ruling lines of its layout, without rendering it
+        ?param layouts: Layouts of the PDF
+        ?param page_pdf: Page number
+        !Returns: The tables of the page, or None when the layout has no plausible
+            grid (e.g. scanned pages) and the page has to be rendered
+        """
+        with self.stats.stage("layout"):
+            layout = layouts[f"page_{page_pdf}"]["layout"]
+            horizontal_text = get_layout_objects(layout)["horizontal_text"]
+        with self.stats.stage("ruling_segments"):
+            vertical_lines, horizontal_lines = get_ruling_segments(layout)
+        with self.stats.stage("find_joints"):
+            table_bbox = find_vector_tables(
+                v_segments = vertical_lines,
+                h_segments = horizontal_lines,
+                joint_tol = self.joint_tol
+            )
+        self.stats.count("joints", sum(len(joints) for joints in table_bbox.values()))
+        if not has_plausible_grid(table_bbox):
+            return None
+        
+        return self._generate_table(
+            page_pdf = page_pdf,
+            table_bbox = table_bbox,
+            vertical_lines = vertical_lines,
+            horizontal_lines = horizontal_lines,
+            horizontal_text = horizontal_text,
+            pdf_scalers = None
         )
-        # settings for LLPRAMS
-        layout_kwargs = {
-        'char_margin': 1.0, 
-        'line_margin': 0.5, 
-        'word_margin': 0.1, 
-        'detect_vertical': True, 
-        'all_texts': True
+    
+    def _convert_pages(self, file_name, pages, dpi):
+        # a page range is rendered at once, so its time goes to the document
+        with self.stats.stage("render"):
+            if self.in_memory:
+                return convert_pdf_to_array(file_name = file_name, pages = pages, dpi = dpi)
+            return convert_pdf_to_img(file_name = file_name, folder=self.folder, pages = pages, dpi = dpi)
+    
+    @contextmanager
+    def _memory_tracing(self):
+        tracing = self.track_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        try:
+            yield
+        finally:
+            if tracing:
+                tracemalloc.stop()
+    
+    def _extract_page(self, extract, page_pdf, resident_images = (), **kwargs):
+        """
+        TODO: Run the extraction of a page, recording its stats and, when track_memory is set, its peak memory
+        ?param extract: extract_table or extract_vector_table
+        ?param page_pdf: Page number
+        ?param resident_images: Rendered images of the other pages of the
+            batch, held in memory while this page is extracted
+        The memory figure is the memory allocated above what was in use
+        before the page, plus the rendered images held in memory (the
+        page's own and resident_images) when they are arrays.
+        """
+        with self.stats.page(page_pdf) as page_stats:
+            if not self.track_memory:
+                return extract(page_pdf = page_pdf, **kwargs)
+            tracemalloc.reset_peak()
+            start, _ = tracemalloc.get_traced_memory()
+            data = extract(page_pdf = page_pdf, **kwargs)
+            peak = tracemalloc.get_traced_memory()[1] - start
+            images = [kwargs.get("path_img")] + list(resident_images)
+            peak += sum(image.nbytes for image in images if isinstance(image, np.ndarray))
+            key = f"page_{page_pdf}"
+            self.memory_pdf_dict[key] = max(self.memory_pdf_dict.get(key, 0), peak)
+            page_stats["peak_memory"] = self.memory_pdf_dict[key]
+            return data
+    
+    def iter_pages(self, file_name, pages):
+        """
+        TODO: Extract the tables of some pages of a downloaded PDF, one page at a time
+        ?param file_name: Path to the PDF file
+        ?param pages: Pages to extract
+        !Yields: (page number, tables of the page) as soon as a page is done,
+            see `_generate_table` for the tables
+        With adaptive_dpi, pages are rendered at the lowest resolution
+        first and only the pages without a plausible grid are rendered
+        again at the next one, up to `dpi`. In "vector" mode, only the
+        pages whose layout has no ruling lines are rendered at all.
+        Pages are rendered render_batch_size consecutive pages at a time.
+        """
+        if self.adaptive_dpi:
+            dpi_steps = [dpi for dpi in ADAPTIVE_DPI_STEPS if dpi < self.dpi] + [self.dpi]
+        else:
+            dpi_steps = [self.dpi]
+        
+        # Extract layouts, only the requested pages are analysed
+        layouts = LazyPDFLayouts(file_name = file_name, **self.layout_kwargs)
+        with layouts, self._memory_tracing():
+            if self.mode == "vector":
+                failed_pages = []
+                for page_pdf in pages:
+                    tables = self._extract_page(self.extract_vector_table, layouts = layouts, page_pdf = page_pdf)
+                    if tables is None:
+                        failed_pages.append(page_pdf)
+                        continue
+                    layouts.release(f"page_{page_pdf}")
+                    yield page_pdf, tables
+                pages = failed_pages
+            
+            for step, dpi in enumerate(dpi_steps):
+                if not pages:
+                    break
+                failed_pages = []
+                # render a few consecutive pages at a time, so the first tables come
+                # after one batch and only one batch of images is held at once
+                for batch in get_page_batches(pages, self.render_batch_size):
+                    path_img_list = self._convert_pages(file_name, batch, dpi)
+                    for page_pdf in batch:
+                        # an image is dropped once its page is done, the next ones stay resident
+                        path_img = path_img_list.pop(0) if path_img_list else None
+                        tables = self._extract_page(
+                            self.extract_table,
+                            layouts = layouts,
+                            page_pdf = page_pdf,
+                            resident_images = path_img_list,
+                            path_img = path_img,
+                            require_grid = step < len(dpi_steps) - 1
+                        )
+                        if tables is None:
+                            failed_pages.append(page_pdf)
+                            continue
+                        layouts.release(f"page_{page_pdf}")
+                        yield page_pdf, tables
+                pages = failed_pages
+    
+    def extract_pages(self, file_name, pages):
+        """
+        TODO: Extract the tables of some pages of a downloaded PDF
+        ?param file_name: Path to the PDF file
+        ?param pages: Pages to extract
+        !Returns: Dict of `page_N` -> table data, the rows of every table
+            of the page one after the other
+        """
+        return {
+            f"page_{page_pdf}": page_data(tables)
+            for page_pdf, tables in self.iter_pages(file_name, pages)
         }
-        # Extract layouts
-        layouts = get_pdf_layouts(file_name = file_name, **layout_kwargs)
-        path_img_list = convert_pdf_to_img(file_name = file_name, folder=self.folder, pages = self.page_pdf_list)
+    
+    def _extract_chunk(self, file_name, pages):
+        # runs in a worker process, whose copy of self is discarded afterwards
+        self.stats = ExtractionStats()
+        page_tables = dict(self.iter_pages(file_name, pages))
+        return page_tables, self.memory_pdf_dict, self.stats
+    
+    def _split_pages(self, pages):
+        """
+        TODO: Split pages into one contiguous chunk per worker
+        ?param pages: Pages to extract
+        Chunks of neighbouring pages keep the page ranges rendered by
+        each worker as few as possible.
+        """
+        pages = sorted(set(pages))
+        workers = min(self.workers, len(pages))
+        chunk_size, remainder = divmod(len(pages), workers)
+        chunks = []
+        start = 0
+        for index in range(workers):
+            end = start + chunk_size + (index < remainder)
+            chunks.append(pages[start:end])
+            start = end
+        return chunks
+    
+    def _iter_page_tables(self):
+        """
+        TODO: Download the PDF and yield the tables of every requested page as they are ready
+        !Yields: (page number, tables of the page), cached pages first, then
+            the extracted pages in the order they complete. With several
+            workers a chunk of pages is yielded when its worker finishes.
+        The stats of the run are collected in a new self.stats; the wall
+        and CPU time of the document include the time spent by the
+        consumer between two pages.
+        """
+        self.stats = ExtractionStats()
+        try:
+            with self.stats.page(None):
+                yield from self._extract_document()
+        finally:
+            if self.prometheus:
+                self.stats.observe_document()
+    
+    def _page_done(self, page_pdf):
+        if self.prometheus:
+            self.stats.observe_page(page_pdf)
+    
+    def _extract_document(self):
+        # Download PDF file
+        with self.stats.stage("download"):
+            if self.pdf_cache is not None:
+                file_name = self.pdf_cache.download(url = self.url, folder = self.folder)
+            else:
+                # raises the httpx error, like the cached path, instead of returning None
+                file_name = get_downloader().download(
+                    url = self.url,
+                    folder = self.folder
+                )
+        pages = list(dict.fromkeys(self.page_pdf_list))
+        if self.result_cache is not None:
+            pdf_sha256 = file_sha256(file_name)
+            result_keys = {
+                page_pdf: self.result_cache.key(pdf_sha256, page_pdf, self.extraction_params)
+                for page_pdf in pages
+            }
+            failed_pages = []
+            for page_pdf in pages:
+                tables = self.result_cache.get(result_keys[page_pdf])
+                if tables is None:
+                    failed_pages.append(page_pdf)
+                    continue
+                yield page_pdf, tables
+            pages = failed_pages
         
-        for page_pdf, path_img in zip_longest(self.page_pdf_list, path_img_list):
-            data = self.extract_table(
-                layouts = layouts,
-                page_pdf = page_pdf,
-                path_img = path_img
-            )
-            self.table_pdf_dict[f"page_{page_pdf}"] = data
+        if self.workers > 1 and len(pages) > 1:
+            # every worker opens the document on its own and extracts its chunk of pages
+            executor = ProcessPoolExecutor(max_workers = self.workers)
+            try:
+                futures = [
+                    executor.submit(self._extract_chunk, file_name, chunk)
+                    for chunk in self._split_pages(pages)
+                ]
+                for future in as_completed(futures):
+                    chunk_page_tables, chunk_memory_dict, chunk_stats = future.result()
+                    self.memory_pdf_dict.update(chunk_memory_dict)
+                    self.stats.merge(chunk_stats)
+                    for page_pdf, tables in chunk_page_tables.items():
+                        if self.result_cache is not None:
+                            self.result_cache.set(result_keys[page_pdf], tables)
+                        self._page_done(page_pdf)
+                        yield page_pdf, tables
+            finally:
+                # a consumer that stops early does not wait for the remaining chunks
+                executor.shutdown(cancel_futures = True)
+        elif pages:
+            for page_pdf, tables in self.iter_pages(file_name, pages):
+                if self.result_cache is not None:
+                    self.result_cache.set(result_keys[page_pdf], tables)
+                self._page_done(page_pdf)
+                yield page_pdf, tables
+    
+    def iter_results(self):
+        """
+        TODO: Extract the tables of the requested pages, yielding the structured result of each table as soon as its page is done
+        !Yields: One dict per table with its "page", "order", "bbox", "shape",
+            "cells" and "parsing_report", see `_generate_table`
+        Unlike `run`, nothing is collected into table_pdf_dict, so results
+        can be written out (see export.py) while the next pages are still
+        being extracted. The rendered images are deleted once the
+        iteration ends or stops.
+        """
+        try:
+            for page_pdf, tables in self._iter_page_tables():
+                yield from tables
+        finally:
+            delete_all_files_in_folder(folder_path = self.folder)
+    
+    def iter_tables(self):
+        """
+        TODO: Extract the tables of the requested pages, yielding each one as soon as its page is done
+        !Yields: (page number, table index on the page, bbox (x0, y0, x1, y1)
+            in PDF coordinate space, table data)
+        """
+        results = self.iter_results()
+        try:
+            for table in results:
+                yield table["page"], table["order"] - 1, tuple(table["bbox"]), table["cells"]
+        finally:
+            results.close()
+    
+    def run(self):
+        table_dict = {}
+        for page_pdf, tables in self._iter_page_tables():
+            table_dict[f"page_{page_pdf}"] = page_data(tables)
+        
+        for page_pdf in self.page_pdf_list:
+            self.table_pdf_dict[f"page_{page_pdf}"] = table_dict[f"page_{page_pdf}"]
         print("Table extraction completed successfully.")
+        print(self.stats.summary())
+        if self.memory_pdf_dict:
+            print(f"Peak memory per page: {max(self.memory_pdf_dict.values()) / 2 ** 20:.1f} MB")
         delete_all_files_in_folder(folder_path = self.folder)
         print("All images have been deleted successfully.")
\ No newline at end of file
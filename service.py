@@ -0,0 +1,313 @@
+"""
+Resident extraction service with a warm pool of worker processes.
+
+    python service.py --port 8080 --workers 4 --max-in-flight 8 --max-queued 64
+
+    POST /jobs       {"url": ..., "page_pdf_list": [1, 2], "dpi": 300, "mode": "vector"}
+                     -> 202 {"job_id": ...}, 429 when the queue is full
+    GET  /jobs/<id>  -> {"state": "queued" | "running" | "done" | "failed", "result": ..., "error": ...}
+    GET  /health     -> counts of queued and running jobs
+    GET  /metrics    -> prometheus_client metrics, when --prometheus is set
+
+The worker processes import the pipeline and extract a small synthetic
+PDF when they start, so a job only pays for its own download and
+extraction.
+"""
+import argparse
+import collections
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from batch import JOB_OPTIONS, validate_job
+
+
+class ServiceBusy(Exception):
+    """Raised when a job is submitted while the queue is full."""
+
+
+class JobError(Exception):
+    """Error of a job, carried back from the worker process as its message."""
+
+
+def _warm_up():
+    # runs once in every worker process, before its first job
+    import model
+    from synthetic import synthetic_tables, write_pdf
+    folder = tempfile.mkdtemp(prefix = "tablepdf_warmup_")
+    file_name = os.path.join(folder, "warmup.pdf")
+    try:
+        write_pdf(file_name, synthetic_tables(pages = 1, tables = 1, rows = 3, cols = 3))
+        for mode in ("vector", "image"):
+            pdf_table = model.PDF_TABLE(url = None, folder = folder, page_pdf_list = [1], in_memory = True, mode = mode)
+            try:
+                pdf_table.extract_pages(file_name, [1])
+            except Exception:
+                pass # e.g. no poppler, the job will report it
+    finally:
+        shutil.rmtree(folder, ignore_errors = True)
+
+
+def _run_job(job, folder):
+    # runs in a worker process
+    from model import PDF_TABLE
+    options = {key: job[key] for key in JOB_OPTIONS if key in job}
+    pdf_table = PDF_TABLE(url = job["url"], folder = folder, page_pdf_list = job["page_pdf_list"], **options)
+    try:
+        tables = list(pdf_table.iter_results())
+    except Exception as e:
+        # some errors, e.g. httpx.HTTPStatusError, cannot be unpickled and would break the pool
+        raise JobError(f"{type(e).__name__}: {e}") from None
+    finally:
+        shutil.rmtree(folder, ignore_errors = True)
+    return tables, pdf_table.stats
+
+
+class ExtractionService:
+    """
+    TODO: Run extraction jobs on a warm process pool, with admission control
+    ?param folder: Folder holding one sub-folder per running job
+    ?param workers: Number of worker processes
+    ?param max_in_flight: Number of jobs handed to the pool at once
+    ?param max_queued: Number of jobs waiting for a slot, more are rejected with ServiceBusy
+    ?param max_finished: Number of finished jobs whose result is kept
+    ?param prometheus: Record the stats of every job in the prometheus_client metrics
+    """
+    def __init__(self, folder: str = None, workers: int = 2, max_in_flight: int = None,
+                 max_queued: int = 64, max_finished: int = 1000, prometheus: bool = False):
+        self.folder = folder or tempfile.mkdtemp(prefix = "tablepdf_service_")
+        self.workers = workers
+        self.max_in_flight = max_in_flight or workers
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+        self.prometheus = prometheus
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._queued = collections.deque()
+        self._finished = collections.deque()
+        self._running = 0
+        self._restarting = False
+        self._closed = False
+        os.makedirs(self.folder, exist_ok = True)
+        self._executor = self._start_pool()
+
+    def _start_pool(self):
+        executor = ProcessPoolExecutor(max_workers = self.workers, initializer = _warm_up)
+        # start the workers now instead of on the first job
+        for future in [executor.submit(time.sleep, 0) for _ in range(self.workers)]:
+            future.result()
+        return executor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, job):
+        """
+        TODO: Queue a job and return its id right away
+        ?param job: Dict with the PDF_TABLE arguments, see `validate_job`
+        """
+        job = validate_job(job)
+        with self._lock:
+            no_slot = self._running >= self.max_in_flight or self._restarting
+            if no_slot and len(self._queued) >= self.max_queued:
+                raise ServiceBusy(f"{self._running} jobs running and {len(self._queued)} queued")
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "state": "queued", "job": job, "submitted": time.time(),
+                "result": None, "error": None
+            }
+            self._queued.append(job_id)
+            started, restart = self._dispatch()
+        self._watch(started, restart)
+        return job_id
+
+    def _dispatch(self):
+        """
+        TODO: Hand the queued jobs to the pool, up to max_in_flight
+        Called with the lock held, the callbacks are added by `_watch` once
+        it is released. When a worker died the pool is broken: the job goes
+        back to the front of the queue and `restart` is True for the one
+        caller that must start a new pool.
+        !Returns: List of (job id, future) and restart
+        """
+        started = []
+        while self._queued and self._running < self.max_in_flight and not self._restarting:
+            job_id = self._queued[0]
+            entry = self._jobs[job_id]
+            try:
+                future = self._executor.submit(_run_job, entry["job"], os.path.join(self.folder, job_id))
+            except BrokenProcessPool:
+                self._restarting = True
+                return started, True
+            self._queued.popleft()
+            entry["state"] = "running"
+            entry["started"] = time.time()
+            self._running += 1
+            started.append((job_id, future))
+        return started, False
+
+    def _watch(self, started, restart = False):
+        for job_id, future in started:
+            future.add_done_callback(lambda future, job_id = job_id: self._done(job_id, future))
+        if restart:
+            # the new workers warm up in the background, jobs are still accepted and queued meanwhile
+            threading.Thread(target = self._restart_pool, daemon = True).start()
+
+    def _restart_pool(self):
+        executor = self._start_pool()
+        with self._lock:
+            broken, self._executor = self._executor, executor
+            self._restarting = False
+            started, restart = ([], False) if self._closed else self._dispatch()
+        broken.shutdown(wait = False)
+        if self._closed:
+            executor.shutdown(wait = False)
+        self._watch(started, restart)
+
+    def _done(self, job_id, future):
+        try:
+            tables, stats = future.result()
+            result, error = {"tables": tables, "stats": stats.as_dict()}, None
+        except JobError as e:
+            stats, result, error = None, None, str(e)
+        except Exception as e:
+            stats, result, error = None, None, f"{type(e).__name__}: {e}"
+        if stats is not None and self.prometheus:
+            for page in stats.pages:
+                stats.observe_page(page)
+            stats.observe_document()
+        with self._lock:
+            entry = self._jobs[job_id]
+            entry.update(state = "failed" if error else "done", result = result, error = error, finished = time.time())
+            self._running -= 1
+            self._finished.append(job_id)
+            while len(self._finished) > self.max_finished:
+                self._jobs.pop(self._finished.popleft(), None)
+            started, restart = self._dispatch()
+        self._watch(started, restart)
+
+    def status(self, job_id):
+        """
+        TODO: State of a job, with its result once it is done
+        ?param job_id: Id returned by `submit`
+        !Returns: Dict with "state", "result" and "error", or None for an unknown job
+        """
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            if entry is None:
+                return None
+            return {key: value for key, value in entry.items() if key != "job"}
+
+    def health(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "running": self._running,
+                "queued": len(self._queued),
+                "max_in_flight": self.max_in_flight,
+                "max_queued": self.max_queued,
+                "restarting": self._restarting,
+            }
+
+    def close(self):
+        """
+        TODO: Stop the worker processes, waiting for the running jobs
+        """
+        with self._lock:
+            self._closed = True
+            for job_id in self._queued:
+                self._jobs[job_id].update(state = "failed", error = "Service stopped")
+            self._queued.clear()
+        self._executor.shutdown(wait = True)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    service = None
+
+    def _send(self, code, body, content_type = "application/json"):
+        data = body if isinstance(body, bytes) else json.dumps(body, ensure_ascii = False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            return self._send(404, {"error": "Not found"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            job_id = self.service.submit(json.loads(self.rfile.read(length) or b"null"))
+        except ServiceBusy as e:
+            return self._send(429, {"error": str(e)})
+        except ValueError as e:
+            return self._send(400, {"error": str(e)})
+        self._send(202, {"job_id": job_id})
+
+    def do_GET(self):
+        path = self.path.rstrip("/")
+        if path == "/health":
+            return self._send(200, self.service.health())
+        if path == "/metrics" and self.service.prometheus:
+            from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+            return self._send(200, generate_latest(), CONTENT_TYPE_LATEST)
+        if path.startswith("/jobs/"):
+            status = self.service.status(path[len("/jobs/"):])
+            if status is not None:
+                return self._send(200, status)
+        self._send(404, {"error": "Not found"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(service, host = "127.0.0.1", port = 8080):
+    """
+    TODO: Serve the HTTP API of a service until interrupted
+    ?param service: ExtractionService
+    ?param host: Address to listen on
+    ?param port: Port to listen on
+    """
+    handler = type("Handler", (_Handler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"Extraction service listening on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Run the table extraction service")
+    parser.add_argument("--host", default = "127.0.0.1")
+    parser.add_argument("--port", type = int, default = 8080)
+    parser.add_argument("--folder", help = "folder for the files of running jobs, a temporary one by default")
+    parser.add_argument("--workers", type = int, default = os.cpu_count() or 1)
+    parser.add_argument("--max-in-flight", type = int, help = "jobs handed to the pool at once, --workers by default")
+    parser.add_argument("--max-queued", type = int, default = 64, help = "waiting jobs above which new jobs are rejected")
+    parser.add_argument("--prometheus", action = "store_true", help = "expose prometheus_client metrics on /metrics")
+    args = parser.parse_args(argv)
+    service = ExtractionService(
+        folder = args.folder,
+        workers = args.workers,
+        max_in_flight = args.max_in_flight,
+        max_queued = args.max_queued,
+        prometheus = args.prometheus
+    )
+    serve(service, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import time
+from contextlib import contextmanager
+
+# stages timed by PDF_TABLE, in pipeline order
+STAGES = (
+    "download",
+    "layout",
+    "ruling_segments",
+    "render",
+    "threshold",
+    "find_lines",
+    "find_joints",
+    "table_edges",
+    "text_assignment",
+)
+# objects counted by PDF_TABLE
+COUNTS = ("text_lines", "segments", "joints", "tables", "cells")
+
+_prometheus_metrics = None
+
+
+def prometheus_metrics():
+    """
+    TODO: Create the prometheus_client metrics of the extraction, once per process
+    !Returns: Dict of metric name -> metric, registered in the default
+        registry so the scraper of a long-running worker collects them
+    """
+    global _prometheus_metrics
+    if _prometheus_metrics is None:
+        try:
+            from prometheus_client import Counter, Histogram
+        except ImportError:
+            raise ImportError("Prometheus metrics need prometheus_client, install it with `pip install prometheus_client`")
+        _prometheus_metrics = {
+            "stage_seconds": Histogram(
+                "tablepdf_stage_seconds", "Wall time of an extraction stage", ["stage"]
+            ),
+            "stage_cpu_seconds": Counter(
+                "tablepdf_stage_cpu_seconds", "CPU time of an extraction stage", ["stage"]
+            ),
+            "page_seconds": Histogram(
+                "tablepdf_page_seconds", "Wall time of the extraction of a page"
+            ),
+            "page_peak_memory_bytes": Histogram(
+                "tablepdf_page_peak_memory_bytes", "Peak memory of the extraction of a page",
+                buckets = [2 ** n for n in range(20, 32)]
+            ),
+            "objects": Counter(
+                "tablepdf_objects", "Objects found on the extracted pages", ["kind"]
+            ),
+            "pages": Counter("tablepdf_pages", "Extracted pages"),
+            "documents": Counter("tablepdf_documents", "Extracted documents"),
+        }
+    return _prometheus_metrics
+
+
+def _new_record():
+    return {"stages": {}, "counts": {}, "wall_time": 0.0, "cpu_time": 0.0, "peak_memory": None}
+
+
+class ExtractionStats:
+    """
+    TODO: Wall time, CPU time, peak memory and object counts of an extraction
+
+    `pages` maps a page number to its record and `document` holds the
+    stages that are not tied to one page (download, rendering of a page
+    range). A record is a dict with:
+        "stages": stage -> {"wall_time", "cpu_time", "calls"}
+        "counts": count name -> number of objects
+        "wall_time", "cpu_time": totals of the page (or document)
+        "peak_memory": bytes, when PDF_TABLE.track_memory is set
+    CPU time is the one of the process running the stage, so it stays
+    right when pages are extracted by worker processes.
+    """
+    def __init__(self):
+        self.document = _new_record()
+        self.pages = {}
+        self._page = None
+
+    def _record(self, page = None):
+        page = self._page if page is None else page
+        if page is None:
+            return self.document
+        if page not in self.pages:
+            self.pages[page] = _new_record()
+        return self.pages[page]
+
+    @contextmanager
+    def page(self, page):
+        """
+        TODO: Attribute the stages and counts recorded inside the block to a page
+        ?param page: Page number
+        """
+        previous, self._page = self._page, page
+        record = self._record()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record["wall_time"] += time.perf_counter() - wall
+            record["cpu_time"] += time.process_time() - cpu
+            self._page = previous
+
+    @contextmanager
+    def stage(self, name, page = None):
+        """
+        TODO: Time a stage, adding up the calls of the same page
+        ?param name: Stage name, see STAGES
+        ?param page: Page number, by default the one of the enclosing `page` block
+        """
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            timing = self._record(page)["stages"].setdefault(
+                name, {"wall_time": 0.0, "cpu_time": 0.0, "calls": 0}
+            )
+            timing["wall_time"] += time.perf_counter() - wall
+            timing["cpu_time"] += time.process_time() - cpu
+            timing["calls"] += 1
+
+    def count(self, name, value, page = None):
+        """
+        TODO: Add to an object count
+        ?param name: Count name, see COUNTS
+        ?param value: Number of objects
+        ?param page: Page number, by default the one of the enclosing `page` block
+        """
+        counts = self._record(page)["counts"]
+        counts[name] = counts.get(name, 0) + value
+
+    def merge(self, other):
+        """
+        TODO: Add the records of another ExtractionStats, e.g. the one of a worker process
+        ?param other: ExtractionStats
+        """
+        pairs = [(self.document, other.document)]
+        pairs += [(self._record(page), record) for page, record in other.pages.items()]
+        for record, other_record in pairs:
+            for name, timing in other_record["stages"].items():
+                total = record["stages"].setdefault(name, {"wall_time": 0.0, "cpu_time": 0.0, "calls": 0})
+                for key in total:
+                    total[key] += timing[key]
+            for name, value in other_record["counts"].items():
+                record["counts"][name] = record["counts"].get(name, 0) + value
+            record["wall_time"] += other_record["wall_time"]
+            record["cpu_time"] += other_record["cpu_time"]
+            if other_record["peak_memory"] is not None:
+                record["peak_memory"] = max(record["peak_memory"] or 0, other_record["peak_memory"])
+
+    def stage_totals(self):
+        """
+        TODO: Sum every stage over the document and its pages
+        !Returns: Dict of stage -> {"wall_time", "cpu_time", "calls"}, in STAGES order
+        """
+        totals = {}
+        for record in [self.document] + list(self.pages.values()):
+            for name, timing in record["stages"].items():
+                total = totals.setdefault(name, {"wall_time": 0.0, "cpu_time": 0.0, "calls": 0})
+                for key in total:
+                    total[key] += timing[key]
+        order = {name: index for index, name in enumerate(STAGES)}
+        return dict(sorted(totals.items(), key = lambda item: order.get(item[0], len(order))))
+
+    def count_totals(self):
+        """
+        TODO: Sum every count over the pages
+        """
+        totals = {}
+        for record in [self.document] + list(self.pages.values()):
+            for name, value in record["counts"].items():
+                totals[name] = totals.get(name, 0) + value
+        return totals
+
+    @property
+    def peak_memory(self):
+        peaks = [record["peak_memory"] for record in self.pages.values() if record["peak_memory"] is not None]
+        return max(peaks) if peaks else None
+
+    def as_dict(self):
+        """
+        TODO: JSON-serialisable copy of the stats
+        """
+        return {
+            "document": self.document,
+            "pages": {str(page): record for page, record in sorted(self.pages.items())},
+            "stages": self.stage_totals(),
+            "counts": self.count_totals(),
+            "peak_memory": self.peak_memory,
+        }
+
+    def summary(self):
+        """
+        TODO: One line with the wall time of every stage and the object counts
+        """
+        stages = ", ".join(f"{name} {timing['wall_time']:.2f}s" for name, timing in self.stage_totals().items())
+        counts = ", ".join(f"{name} {value}" for name, value in self.count_totals().items())
+        # every page may come from the result cache, with nothing counted
+        return f"Time per stage: {stages or 'none'}. Counts: {counts or 'none'}."
+
+    def observe_page(self, page):
+        """
+        TODO: Record the stats of a page in the prometheus_client metrics
+        ?param page: Page number
+        """
+        metrics = prometheus_metrics()
+        record = self.pages.get(page)
+        if record is None:
+            return
+        self._observe_stages(metrics, record)
+        metrics["page_seconds"].observe(record["wall_time"])
+        if record["peak_memory"] is not None:
+            metrics["page_peak_memory_bytes"].observe(record["peak_memory"])
+        for name, value in record["counts"].items():
+            metrics["objects"].labels(kind = name).inc(value)
+        metrics["pages"].inc()
+
+    def observe_document(self):
+        """
+        TODO: Record the stages of the document in the prometheus_client metrics
+        """
+        metrics = prometheus_metrics()
+        self._observe_stages(metrics, self.document)
+        metrics["documents"].inc()
+
+    @staticmethod
+    def _observe_stages(metrics, record):
+        for name, timing in record["stages"].items():
+            metrics["stage_seconds"].labels(stage = name).observe(timing["wall_time"])
+            metrics["stage_cpu_seconds"].labels(stage = name).inc(timing["cpu_time"])
+
+    def __repr__(self):
+        return f"<ExtractionStats pages={len(self.pages)}>"
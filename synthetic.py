@@ -0,0 +1,112 @@
+"""
+Synthetic PDFs with ruled tables, written without any PDF library.
+
+Used by the benchmark and by the warm-up of the extraction service, so
+both extract the same known geometry offline.
+"""
+import numpy as np
+
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792 # letter, in PDF points
+MARGIN = 36
+FONT_SIZE = 6
+
+
+def _pdf_string(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def synthetic_tables(pages, tables, rows, cols, merge_every = 4, seed = 0):
+    """
+    TODO: Build the geometry and text of ruled tables for every page
+    ?param pages: Number of pages
+    ?param tables: Number of tables per page, stacked vertically
+    ?param rows: Number of rows per table
+    ?param cols: Number of columns per table
+    ?param merge_every: Every merge_every-th row has its first two cells merged
+    ?param seed: Seed of the random cell text
+    !Returns: One list per page of tables, each a dict with "bbox"
+        (x0, y0, x1, y1), "cols" [(x0, x1)], "rows" [(y_top, y_bottom)],
+        "segments" [(x0, y0, x1, y1)] and "texts" [(x, y, text)], in PDF
+        coordinate space
+    """
+    rng = np.random.default_rng(seed)
+    gap = 24
+    table_height = (PAGE_HEIGHT - 2 * MARGIN - gap * (tables - 1)) / tables
+    row_height = table_height / rows
+    col_width = (PAGE_WIDTH - 2 * MARGIN) / cols
+    max_chars = int(col_width / (FONT_SIZE * 0.55)) - 1
+    words = ["total", "net", "asset", "fund", "value", "unit", "cash", "bond", "2024", "%"]
+
+    document = []
+    for page in range(pages):
+        page_tables = []
+        for index in range(tables):
+            top = PAGE_HEIGHT - MARGIN - index * (table_height + gap)
+            xs = [MARGIN + c * col_width for c in range(cols + 1)]
+            ys = [top - r * row_height for r in range(rows + 1)]
+            segments = [(xs[0], y, xs[-1], y) for y in ys]
+            texts = []
+            for r in range(rows):
+                merged = merge_every and r % merge_every == merge_every - 1 and cols > 1
+                for c in range(cols + 1):
+                    if merged and c == 1:
+                        continue # no separator inside the merged cell
+                    segments.append((xs[c], ys[r + 1], xs[c], ys[r]))
+                for c in range(cols):
+                    if merged and c == 1:
+                        continue
+                    width = max_chars * (2 if merged and c == 0 else 1)
+                    text = f"p{page}t{index}r{r}c{c} " + " ".join(rng.choice(words, size = 4))
+                    texts.append((xs[c] + 2, ys[r + 1] + (row_height - FONT_SIZE) / 2 + 1, text[:width]))
+            page_tables.append({
+                "bbox": (xs[0], ys[-1], xs[-1], ys[0]),
+                "cols": [(xs[c], xs[c + 1]) for c in range(cols)],
+                "rows": [(ys[r], ys[r + 1]) for r in range(rows)],
+                "segments": segments,
+                "texts": texts
+            })
+        document.append(page_tables)
+    return document
+
+
+def write_pdf(file_name, document):
+    """
+    TODO: Write the synthetic tables as a PDF, with Helvetica text and stroked lines
+    ?param file_name: Path to the PDF file
+    ?param document: Output of `synthetic_tables`
+    """
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None, # pages, filled in once the page objects are numbered
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    page_ids = []
+    for page_tables in document:
+        content = ["0.5 w"]
+        for table in page_tables:
+            content += [f"{x0:.2f} {y0:.2f} m {x1:.2f} {y1:.2f} l S" for x0, y0, x1, y1 in table["segments"]]
+            content += [
+                f"BT /F1 {FONT_SIZE} Tf {x:.2f} {y:.2f} Td ({_pdf_string(text)}) Tj ET"
+                for x, y, text in table["texts"]
+            ]
+        stream = "\n".join(content).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % (PAGE_WIDTH, PAGE_HEIGHT, len(objects))
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode()
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start = 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(file_name, "wb") as file:
+        file.write(output)
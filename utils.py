@@ -1,9 +1,12 @@
-import cv2
 import numpy as np
+from collections import defaultdict
+# cv2 is imported inside the functions using it, so importing utils stays cheap
 
 def find_lines(
     threshold, regions=None, direction="horizontal", line_scale=15, iterations=0
 ):
+    import cv2
+
     lines = []
 
     if direction == "vertical":
@@ -15,25 +18,32 @@ def find_lines(
     elif direction is None:
         raise ValueError("Specify direction as either 'vertical' or 'horizontal'")
 
+    if threshold.dtype != np.uint8:
+        threshold = threshold.astype(np.uint8)
+
     if regions is not None:
-        region_mask = np.zeros(threshold.shape)
+        region_mask = np.zeros(threshold.shape, dtype=np.uint8)
         for region in regions:
             x, y, w, h = region
-            region_mask[y : y + h, x : x + w] = 1
-        threshold = np.multiply(threshold, region_mask)
+            region_mask[y : y + h, x : x + w] = 255
+        threshold = cv2.bitwise_and(threshold, region_mask)
 
-    threshold = cv2.erode(threshold, el)
-    threshold = cv2.dilate(threshold, el)
-    dmask = cv2.dilate(threshold, el, iterations=iterations)
+    # the opening stays in one uint8 buffer, `threshold` itself is left untouched
+    mask = cv2.erode(threshold, el)
+    cv2.dilate(mask, el, dst=mask)
+    if iterations > 0:
+        dmask = cv2.dilate(mask, el, iterations=iterations)
+    else:
+        dmask = mask
 
     try:
         _, contours, _ = cv2.findContours(
-            threshold.astype(np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+            mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
         )
     except ValueError:
         # for opencv backward compatibility
         contours, _ = cv2.findContours(
-            threshold.astype(np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+            mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
         )
 
     for c in contours:
@@ -49,16 +59,18 @@ def find_lines(
 
 
 def find_contours(vertical, horizontal):
-    mask = vertical + horizontal
+    import cv2
+
+    mask = cv2.bitwise_or(vertical, horizontal)
 
     try:
         __, contours, __ = cv2.findContours(
-            mask.astype(np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+            mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
         )
     except ValueError:
         # for opencv backward compatibility
         contours, __ = cv2.findContours(
-            mask.astype(np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+            mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
         )
     # sort in reverse based on contour area and use first 10 contours
     contours = sorted(contours, key=cv2.contourArea, reverse=True)[:10]
@@ -95,32 +107,156 @@ def find_joints(contours, vertical, horizontal):
         and (x2, y2) -> rt in image coordinate space.
 
     """
-    joints = np.multiply(vertical, horizontal)
+    import cv2
+
     tables = {}
-    for c in contours:
-        x, y, w, h = c
-        roi = joints[y : y + h, x : x + w]
-        try:
-            __, jc, __ = cv2.findContours(
-                roi.astype(np.uint8), cv2.RETR_CCOMP, cv2.CHAIN_APPROX_SIMPLE
-            )
-        except ValueError:
-            # for opencv backward compatibility
-            jc, __ = cv2.findContours(
-                roi.astype(np.uint8), cv2.RETR_CCOMP, cv2.CHAIN_APPROX_SIMPLE
-            )
-        if len(jc) <= 4:  # remove contours with less than 4 joints
+    if not contours:
+        return tables
+
+    # only the area covered by the table boundaries is searched for joints
+    x, y, w, h = (np.array(c)[:, None] for c in zip(*contours))
+    left, top = int(x.min()), int(y.min())
+    right, bottom = int((x + w).max()), int((y + h).max())
+    vertical = vertical[top:bottom, left:right]
+    horizontal = horizontal[top:bottom, left:right]
+    if vertical.dtype == np.uint8 and horizontal.dtype == np.uint8:
+        joints = cv2.bitwise_and(vertical, horizontal)
+    else:
+        joints = np.logical_and(vertical, horizontal).astype(np.uint8)
+
+    # outline every joint of the page once and take their bounding boxes
+    # with vectorized reductions instead of a boundingRect call per joint
+    try:
+        __, jc, __ = cv2.findContours(joints, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    except ValueError:
+        # for opencv backward compatibility
+        jc, __ = cv2.findContours(joints, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not jc:
+        return tables
+    points = np.concatenate(jc).reshape(-1, 2)
+    starts = np.cumsum([0] + [len(j) for j in jc[:-1]])
+    jx = np.minimum.reduceat(points[:, 0], starts)
+    jy = np.minimum.reduceat(points[:, 1], starts)
+    jw = np.maximum.reduceat(points[:, 0], starts) - jx + 1
+    jh = np.maximum.reduceat(points[:, 1], starts) - jy + 1
+    jx, jy = jx + left, jy + top
+
+    # clip each joint to each table boundary, (tables, joints) arrays
+    x1, x2 = np.maximum(jx, x), np.minimum(jx + jw, x + w)
+    y1, y2 = np.maximum(jy, y), np.minimum(jy + jh, y + h)
+    inside = (x2 > x1) & (y2 > y1)
+    c1, c2 = (x1 + x2) // 2, (y1 + y2) // 2
+
+    for k, (x, y, w, h) in enumerate(contours):
+        in_table = inside[k]
+        if np.count_nonzero(in_table) <= 4:  # remove contours with less than 4 joints
             continue
-        joint_coords = []
-        for j in jc:
-            jx, jy, jw, jh = cv2.boundingRect(j)
-            c1, c2 = x + (2 * jx + jw) // 2, y + (2 * jy + jh) // 2
-            joint_coords.append((c1, c2))
+        joint_coords = list(zip(c1[k, in_table].tolist(), c2[k, in_table].tolist()))
         tables[(x, y + h, x + w, y)] = joint_coords
 
     return tables
 
 
+def find_vector_tables(v_segments, h_segments, joint_tol=2, max_tables=10):
+    """Finds tables and their joints from ruling segments, the vector
+    counterpart of `find_contours` and `find_joints`.
+
+    Parameters
+    ----------
+    v_segments : list
+        Vertical segments (x, y0, x, y1) in PDF coordinate space.
+    h_segments : list
+        Horizontal segments (x0, y, x1, y) in PDF coordinate space.
+    joint_tol : int, optional (default: 2)
+        Tolerance under which a horizontal and a vertical segment meet.
+    max_tables : int, optional (default: 10)
+        Number of largest groups of segments kept, as `find_contours`
+        keeps the 10 largest contours.
+
+    Returns
+    -------
+    tables : dict
+        Dict with table boundaries as keys and list of intersections
+        in that boundary as their value.
+        Keys are of the form (x1, y1, x2, y2) where (x1, y1) -> lb
+        and (x2, y2) -> rt in PDF coordinate space.
+
+    """
+    if not v_segments or not h_segments:
+        return {}
+    v = np.asarray(v_segments, dtype=float)
+    h = np.asarray(h_segments, dtype=float)
+    # every (horizontal, vertical) pair that crosses or touches
+    h_index, v_index = np.nonzero(
+        (v[None, :, 0] >= h[:, None, 0] - joint_tol)
+        & (v[None, :, 0] <= h[:, None, 2] + joint_tol)
+        & (h[:, None, 1] >= v[None, :, 1] - joint_tol)
+        & (h[:, None, 1] <= v[None, :, 3] + joint_tol)
+    )
+
+    # group segments connected through their joints, h[i] -> i, v[j] -> len(h) + j
+    parent = list(range(len(h) + len(v)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in zip(h_index, v_index):
+        parent[find(i)] = find(len(h) + j)
+
+    joints = defaultdict(list)
+    for i, j in zip(h_index, v_index):
+        joints[find(i)].append((v[j, 0], h[i, 1]))
+    roots = np.array([find(i) for i in range(len(parent))])
+    h_roots, v_roots = roots[: len(h)], roots[len(h) :]
+
+    tables = []
+    for root, table_joints in joints.items():
+        h_members = np.nonzero(h_roots == root)[0]
+        v_members = np.nonzero(v_roots == root)[0]
+        x1 = min(h[h_members, 0].min(), v[v_members, 0].min())
+        x2 = max(h[h_members, 2].max(), v[v_members, 0].max())
+        y1 = min(h[h_members, 1].min(), v[v_members, 1].min())
+        y2 = max(h[h_members, 1].max(), v[v_members, 3].max())
+        tables.append(((x1, y1, x2, y2), table_joints))
+    tables.sort(key=lambda t: (t[0][2] - t[0][0]) * (t[0][3] - t[0][1]), reverse=True)
+
+    return {
+        bbox: table_joints
+        for bbox, table_joints in tables[:max_tables]
+        if len(table_joints) > 4  # remove tables with less than 4 joints
+    }
+
+
+def has_plausible_grid(tables, line_tol=2):
+    """Checks whether `find_joints` found at least one table whose
+    joints span two or more distinct rows and columns.
+
+    Parameters
+    ----------
+    tables : dict
+        Output of `find_joints`.
+    line_tol : int, optional (default: 2)
+        Tolerance in pixels under which joints are on the same line.
+
+    Returns
+    -------
+    plausible : bool
+
+    """
+    for joints in tables.values():
+        if not joints:
+            continue
+        xs, ys = zip(*joints)
+        cols = merge_close_lines(sorted(set(xs)), line_tol=line_tol)
+        rows = merge_close_lines(sorted(set(ys)), line_tol=line_tol)
+        if len(cols) >= 2 and len(rows) >= 2:
+            return True
+    return False
+
+
 def merge_close_lines(ar, line_tol=2):
     """Merges lines which are within a tolerance by calculating a
     moving mean, based on their x or y axis projections.
@@ -135,15 +271,110 @@ def merge_close_lines(ar, line_tol=2):
     ret : list
 
     """
-    ret = []
-    for a in ar:
-        if not ret:
-            ret.append(a)
-        else:
+    return merge_close_lines_batch([ar], line_tol=line_tol)[0]
+
+
+def merge_close_lines_batch(arrays, line_tol=2):
+    """Merges close lines of several line arrays in one pass.
+
+    The arrays are concatenated and segmented on the gaps between
+    neighbours. In a monotonic array the moving mean of a run always
+    lies behind the last line of the run, so a gap larger than the
+    tolerance is a certain break. Only the runs left between those
+    breaks are walked one line at a time, which keeps the result equal
+    to the sequential moving mean of `merge_close_lines`.
+
+    Parameters
+    ----------
+    arrays : list
+        List of sorted (ascending or descending) line arrays.
+    line_tol : int, optional (default: 2)
+
+    Returns
+    -------
+    merged : list
+        List with the merged lines of every array.
+
+    """
+    lengths = np.array([len(ar) for ar in arrays], dtype=int)
+    merged = [[] for _ in arrays]
+    if not lengths.sum():
+        return merged
+    values = np.concatenate([np.asarray(ar, dtype=float) for ar in arrays])
+    items = [a for ar in arrays for a in ar]
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+
+    gaps = np.diff(values)
+    # same test as np.isclose(temp, a, atol=line_tol)
+    breaks = np.abs(gaps) > line_tol + 1e-05 * np.abs(values[1:])
+    for start, end in zip(starts, ends):
+        group = gaps[start:end - 1]
+        if not ((group >= 0).all() or (group <= 0).all()):
+            # unsorted input, the moving mean may get ahead of a line
+            breaks[start:end - 1] = False
+    # arrays never merge into each other
+    boundaries = ends[:-1][lengths[:-1] > 0] - 1
+    breaks[boundaries[boundaries < len(breaks)]] = True
+    run_starts = np.flatnonzero(np.r_[True, breaks])
+    run_ends = np.r_[run_starts[1:], len(values)]
+    owners = np.searchsorted(ends, run_starts, side="right")
+
+    for owner, run_start, run_end in zip(
+        owners.tolist(), run_starts.tolist(), run_ends.tolist()
+    ):
+        ret = merged[owner]
+        ret.append(items[run_start])
+        for a in items[run_start + 1:run_end]:
             temp = ret[-1]
-            if np.isclose(temp, a, atol=line_tol):
-                temp = (temp + a) / 2.0
-                ret[-1] = temp
+            if abs(temp - a) <= line_tol + 1e-05 * abs(a):
+                ret[-1] = (temp + a) / 2.0
             else:
                 ret.append(a)
-    return ret
\ No newline at end of file
+    return merged
+
+def compute_accuracy(error_weights):
+    """Calculates a score based on weights assigned to various
+    parameters and their error percentages.
+
+    Parameters
+    ----------
+    error_weights : list
+        Two-dimensional list of the form [[p1, e1], [p2, e2], ...]
+        where pn is the weight assigned to list of errors en.
+        Sum of pn should be equal to 100.
+
+    Returns
+    -------
+    score : float
+
+    """
+    if sum(ew[0] for ew in error_weights) != 100:
+        raise ValueError("Sum of weights should be equal to 100.")
+    score = 0.0
+    for weight, errors in error_weights:
+        errors = np.asarray(errors, dtype=float)
+        if not errors.size:
+            return 0.0
+        score += weight * (1 - float(errors.mean()))
+    return score
+
+
+def compute_whitespace(d):
+    """Calculates the percentage of empty strings in a
+    two-dimensional list.
+
+    Parameters
+    ----------
+    d : list
+
+    Returns
+    -------
+    whitespace : float
+        Percentage of empty cells.
+
+    """
+    cells = [cell for row in d for cell in row]
+    if not cells:
+        return 0.0
+    return 100 * sum(not cell.strip() for cell in cells) / float(len(cells))
\ No newline at end of file